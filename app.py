@@ -1,16 +1,42 @@
+import time
+_STARTUP_T0 = time.perf_counter()  # 콜드 스타트 측정 (모듈 import 포함)
+
 from flask import (
     Flask, render_template, request, redirect, url_for, flash, session, g,
-    send_from_directory, jsonify
+    jsonify, Response, abort, make_response, Request
 )
 from datetime import datetime, timedelta
 from models import BirthdayNote, Message, PrivateLetter, db
+from likes import LikeEngine
+from like_ledger import LikeLedger
+from search import MessageSearch
+from photo_catalog import PhotoCatalog
+from ratelimit import RateLimited, RateLimiter, buckets_from_url, ratelimit_metrics_lines
+from cache import LocalCache, TieredCache, cache_metrics_lines, shared_backend_from_url
+from photo_store import HashingUploadFile, InvalidImage, PhotoStore, clone_tree, replace_dir
+from static_manifest import MANIFEST_PATH, load_manifest
+from compression import Compression, ENCODING_SUFFIX, compress_bytes, negotiate
+from media_send import MediaSender
+from notifier import SlackDispatcher
+from live_feed import LiveFeed, format_sse
+from versioning import ContentVersion, fingerprint, tree_fingerprint
+from db_routing import REPLICA_BIND, RoutingSession, TimedQueuePool, pool_metrics_lines, read_only
+from images import (
+    DERIVED_DIRNAME, build_derivatives, build_dir_derivatives, remove_derivatives,
+    srcset_entries,
+)
 from dotenv import load_dotenv
 from functools import wraps
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.middleware.proxy_fix import ProxyFix
-import os, re, shutil, time, hashlib
-import json, threading
+from itsdangerous import BadData, URLSafeTimedSerializer
+from jinja2 import pass_context
+from markupsafe import Markup
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+import os, re, hashlib, hmac, base64
+import json, mimetypes, secrets, shutil, sys, threading
 
 load_dotenv()
 
@@ -37,40 +63,107 @@ if IS_PROD:
     app.config["PREFERRED_URL_SCHEME"] = "https"
 
 # 엔진 옵션: Postgres일 때만 search_path/pool 옵션 적용
-if DATABASE_URL.startswith("postgresql"):
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "connect_args": {"options": "-csearch_path=hbd"},  # DB URL의 search_path와 통일 권장
-        "pool_size": 10,
-        "max_overflow": 2,
-        "pool_pre_ping": True,
-        "pool_recycle": 1800,
+def _engine_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    if url.startswith("postgresql"):
+        return {
+            "connect_args": {"options": "-csearch_path=hbd"},  # DB URL의 search_path와 통일 권장
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_pre_ping": True,
+            "pool_recycle": 1800,
+            "poolclass": TimedQueuePool,  # checkout 대기/포화 지표
+        }
+    if url.startswith("sqlite") and ":memory:" not in url:
+        return {"poolclass": TimedQueuePool}
+    return {}
+
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = _engine_options(
+    DATABASE_URL,
+    int(os.getenv("DB_POOL_SIZE", "10")),
+    int(os.getenv("DB_MAX_OVERFLOW", "2")),
+)
+
+# 읽기 전용 replica (선택): @read_only 뷰의 조회만 이쪽으로
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+if DATABASE_REPLICA_URL:
+    app.config["SQLALCHEMY_BINDS"] = {
+        REPLICA_BIND: {
+            "url": DATABASE_REPLICA_URL,
+            **_engine_options(
+                DATABASE_REPLICA_URL,
+                int(os.getenv("READ_POOL_SIZE", "10")),
+                int(os.getenv("READ_MAX_OVERFLOW", "2")),
+            ),
+        }
     }
-else:
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {}
 
 # LB 뒤에서 원 IP/프로토콜 보존
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1, x_prefix=1)  # type: ignore
 
 db.init_app(app)
 
+# HTML/JSON 응답 압축 (리버스 프록시가 이미 압축하면 RESPONSE_COMPRESSION=false)
+if os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true":
+    Compression(app, min_size=int(os.getenv("COMPRESSION_MIN_BYTES", "500")))
+
+# 요청 계측 (opt-in): 엔드포인트별 시간/쿼리/템플릿/파일시스템 → /metrics (METRICS_TOKEN 필요), 느린 요청 스택 덤프
+instrumentation = None
+if os.getenv("INSTRUMENTATION", "false").lower() == "true":
+    from instrumentation import Instrumentation  # 꺼져 있으면 import도 하지 않는다
+
+    instrumentation = Instrumentation(
+        app,
+        slow_ms=float(os.getenv("PROFILE_SLOW_MS", "0")),
+        sample_interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+        profile_dir=os.getenv("PROFILE_DIR", os.path.join(app.instance_path, "profiles")),
+        metrics_token=os.getenv("METRICS_TOKEN", ""),
+    )
+    instrumentation.add_collector(lambda: pool_metrics_lines(db.engines))
+
+# ====== 캐시 (프로세스 메모리 + 선택적 공유 저장소) ======
+# 로컬 단은 모든 캐시가 한 상한을 나눠 쓴다. CACHE_URL(redis://… / sqlite:///…)이 있으면
+# 한 워커가 만든 결과(메인 페이지, 사진 목록, 정적 해시)를 다른 워커도 쓴다.
+caches = TieredCache(
+    LocalCache(int(os.getenv("CACHE_LOCAL_MAX_BYTES", str(64 * 1024 * 1024)))),
+    shared_backend_from_url(
+        os.getenv("CACHE_URL", ""),
+        max_bytes=int(os.getenv("CACHE_SHARED_MAX_BYTES", str(256 * 1024 * 1024))),
+    ),
+)
+if instrumentation is not None:
+    instrumentation.add_collector(lambda: cache_metrics_lines(caches))
+
 # ====== 정적 URL 헬퍼 ======
-_static_digest_cache = {}  # {(filename, mtime): "abcdef1234"}
+# 운영: 빌드 시 만든 static_manifest.json 만 사용(요청 시 파일시스템 접근 없음)
+# 개발: 매니페스트에 없는 파일은 기존처럼 mtime + md5로 즉석 계산
+_static_manifest = load_manifest(os.getenv("STATIC_MANIFEST", MANIFEST_PATH))
+if IS_PROD and not _static_manifest:
+    print("⚠️ static manifest not found — run `python static_manifest.py` at build time")
+
+static_digest_cache = caches.namespace("static-digest")  # {"filename@mtime_ns": "abcdef1234"}
 
 def _digest_of_static(filename: str) -> str:
     path = os.path.join(app.static_folder, filename)
     try:
-        mtime = os.path.getmtime(path)
-        key = (filename, mtime)
-        if key in _static_digest_cache:
-            return _static_digest_cache[key]
-        with open(path, "rb") as f:
-            h = hashlib.md5(f.read()).hexdigest()[:10]
-        _static_digest_cache[key] = h
+        key = f"{filename}@{os.stat(path).st_mtime_ns}"
+        h = static_digest_cache.get(key)
+        if h is None:
+            with open(path, "rb") as f:
+                h = hashlib.md5(f.read()).hexdigest()[:10]
+            static_digest_cache.set(key, h)
         return h
     except Exception:
         return "0"
 
 def static_v(filename: str) -> str:
+    entry = _static_manifest.get(filename)
+    if entry:
+        if entry.get("hashed"):
+            return url_for("static", filename=entry["hashed"])
+        return url_for("static", filename=filename, v=entry["hash"])
+    if IS_PROD:
+        return url_for("static", filename=filename)
     v = _digest_of_static(filename)
     return url_for("static", filename=filename, v=v)
 
@@ -78,15 +171,94 @@ def static_v(filename: str) -> str:
 def inject_static_helper():
     return {"static_v": static_v}
 
+# 미리 압축된 정적 사본(.br/.gz): 매니페스트에 적힌 것만 (요청 때 stat 없음)
+_precompressed = {}
+for _rel, _entry in _static_manifest.items():
+    if _entry.get("encodings"):
+        _precompressed[_rel] = (_rel, tuple(_entry["encodings"]))
+        if _entry.get("hashed"):
+            _precompressed[_entry["hashed"]] = _precompressed[_rel]
+
+# 파일 전송: 워커 직접(sendfile + Range) / X-Accel-Redirect / X-Sendfile — media_send 참고
+media_sender = MediaSender(
+    os.getenv("MEDIA_SEND_MODE", "python").lower(),
+    accel_prefix=os.getenv("MEDIA_ACCEL_PREFIX", "/_protected"),
+)
+media_sender.add_root("static", app.static_folder)
+
+# 해시가 URL에 들어간 경우만 영구 캐시. 버전 없는 URL(매니페스트 누락 등)은 짧게 캐시하고 ETag로 재검증 —
+# 재배포 후 클라이언트가 1년 동안 옛 자산에 묶이지 않도록
+STATIC_UNVERSIONED_MAX_AGE = int(os.getenv("STATIC_UNVERSIONED_MAX_AGE", "300"))
+_hashed_static = {e["hashed"] for e in _static_manifest.values() if e.get("hashed")}
+
+def _static_url_versioned(filename: str) -> bool:
+    if filename in _hashed_static:
+        return True
+    v = request.args.get("v")
+    if not v:
+        return False
+    entry = _static_manifest.get(filename)
+    if entry:
+        return v == entry.get("hash")
+    return not IS_PROD and v == _digest_of_static(filename)
+
+def serve_static(filename):
+    immutable = _static_url_versioned(filename)
+    max_age = app.get_send_file_max_age(filename) if immutable else STATIC_UNVERSIONED_MAX_AGE
+    hit = None if media_sender.offloaded else _precompressed.get(filename)
+    if hit:
+        rel, encodings = hit
+        enc = negotiate(request.headers.get("Accept-Encoding", ""), encodings)
+        if enc:
+            resp = media_sender.send(
+                "static", rel + ENCODING_SUFFIX[enc], max_age=max_age, immutable=immutable,
+                mimetype=mimetypes.guess_type(rel)[0] or "application/octet-stream",
+            )
+            resp.headers["Content-Encoding"] = enc
+            resp.vary.add("Accept-Encoding")
+            return resp
+    return media_sender.send("static", filename, max_age=max_age, immutable=immutable)
+
+app.view_functions["static"] = serve_static
+
 # ====== 사진 저장소 (로컬 디스크) ======
 BASE_DIR = app.root_path
 SRC_PHOTOS_DIR  = os.path.join(BASE_DIR, "static_example", "photos")       # 시드(읽기 전용)
-EDIT_PHOTOS_DIR = os.path.join(BASE_DIR, "media_example", "photos_edit")   # 편집/업로드본
+EDIT_PHOTOS_DIR = os.getenv("EDIT_PHOTOS_DIR") or os.path.join(BASE_DIR, "media_example", "photos_edit")   # 편집/업로드본
 ALLOWED_EXT = {"jpg", "jpeg", "png", "gif", "webp"}
 
 def allowed(fname: str) -> bool:
     return "." in fname and fname.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
+# 업로드 원본은 내용 해시 기반 blob으로 저장(중복 공유), 편집 폴더에는 이름(하드링크)만 둔다
+PHOTO_BLOB_DIR = os.getenv("PHOTO_BLOB_DIR") or os.path.join(BASE_DIR, "media_example", "blobs")
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(15 * 1024 * 1024)))
+# 본문 전체 한도: 사진 한도 + multipart 오버헤드 여유
+app.config["MAX_CONTENT_LENGTH"] = PHOTO_MAX_BYTES + 1024 * 1024
+photo_store = PhotoStore(PHOTO_BLOB_DIR, PHOTO_MAX_BYTES)
+media_sender.add_root("photos_edit", EDIT_PHOTOS_DIR)
+media_sender.add_root("blobs", PHOTO_BLOB_DIR)
+
+class PhotoUploadRequest(Request):
+    """사진 업로드 요청의 파일 파트는 해시를 계산하며 바로 blob 임시 파일로 흘려 쓴다."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == "upload_photo":
+            return photo_store.open_upload()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+app.request_class = PhotoUploadRequest
+
+@app.teardown_request
+def discard_unused_uploads(exception=None):
+    # 검증 실패/예외로 확정되지 않은 업로드 임시 파일 정리 (이미 파싱된 경우에만 확인)
+    files = request.__dict__.get("files")
+    if not files:
+        return
+    for fs in files.values():
+        if isinstance(fs.stream, HashingUploadFile) and not fs.stream.consumed:
+            fs.stream.discard()
+
 def ensure_edit_dir_seed():
     """
     편집용 폴더가 '없을 때만' 원본(/static_example/photos)을 통째로 복제해서 시드한다.
@@ -96,7 +268,7 @@ def ensure_edit_dir_seed():
         return
     os.makedirs(os.path.dirname(EDIT_PHOTOS_DIR), exist_ok=True)
     if os.path.isdir(SRC_PHOTOS_DIR):
-        shutil.copytree(SRC_PHOTOS_DIR, EDIT_PHOTOS_DIR)
+        clone_tree(SRC_PHOTOS_DIR, EDIT_PHOTOS_DIR)
     else:
         os.makedirs(EDIT_PHOTOS_DIR, exist_ok=True)
 
@@ -131,13 +303,80 @@ def json_or_redirect(ok: bool, msg: str, status: int = 200, redirect_ep="index",
         flash(msg, "success" if ok else "error")
         return redirect(url_for(redirect_ep))
 
-def verify_pin_or_birthday(msg: Message, pin: str | None, is_birthday: bool):
+# ====== 요청 속도 제한 (토큰 버킷) ======
+# 규칙 "N/초": 연속 N회까지, 이후 초당 N/초 만큼 회복. 빈 값이나 0이면 그 규칙은 끔.
+# 키는 ProxyFix가 복원한 실제 클라이언트 IP. PIN은 메시지별 버킷도 따로 둬서 IP를 바꿔 가며
+# 1만 개 PIN을 대입하는 것도 막는다.
+limiter = RateLimiter(
+    buckets_from_url(os.getenv("RATE_LIMIT_URL", ""), max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))),
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true",
+)
+limiter.rule("add", os.getenv("RATE_LIMIT_ADD", "5/60"))
+limiter.rule("like", os.getenv("RATE_LIMIT_LIKE", "30/10"))
+limiter.rule("pin_ip", os.getenv("RATE_LIMIT_PIN_IP", "10/60"))
+limiter.rule("pin_message", os.getenv("RATE_LIMIT_PIN_MESSAGE", "10/300"))
+if instrumentation is not None:
+    instrumentation.add_collector(lambda: ratelimit_metrics_lines(limiter))
+
+def client_ip() -> str:
+    return request.remote_addr or "-"
+
+def rate_limit(rule: str):
+    """클라이언트 IP 기준 토큰 버킷 (뷰 본문 전에 확인 → 거절 시 DB/KDF/Slack 비용 없음)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter.check(rule, client_ip())
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@app.errorhandler(RateLimited)
+def on_rate_limited(e):
+    resp = make_response(json_or_redirect(False, "요청이 너무 많습니다. 잠시 후 다시 시도하세요.", status=429))
+    resp.headers["Retry-After"] = str(e.retry_after)
+    return resp
+
+# ====== 방명록 PIN / 수정 토큰 ======
+# 4자리 PIN은 경우의 수가 1만 개뿐이라 느린 KDF가 보안을 크게 더하지 않는다 → 해시 방식 설정 가능
+# 예) PIN_HASH_METHOD=pbkdf2:sha256:20000  (기존 해시는 저장된 방식대로 계속 검증됨)
+PIN_HASH_METHOD = os.getenv("PIN_HASH_METHOD", "scrypt")
+EDIT_TOKEN_MAX_AGE = int(os.getenv("EDIT_TOKEN_MAX_AGE", "600"))  # 초
+_edit_token_serializer = URLSafeTimedSerializer(app.config["SECRET_KEY"], salt="guestbook-edit")
+
+def hash_pin(pin: str) -> str:
+    return generate_password_hash(pin, method=PIN_HASH_METHOD)
+
+def _pin_hash_tag(msg: Message) -> str:
+    # PIN이 바뀌거나 같은 id로 다른 메시지가 생기면 기존 토큰이 무효가 되도록
+    return hashlib.sha256((msg.pin_hash or "").encode("utf-8")).hexdigest()[:16]
+
+def issue_edit_token(msg: Message) -> str:
+    """PIN 검증에 성공한 메시지에 대한 단기 수정/삭제 토큰"""
+    return _edit_token_serializer.dumps({"m": msg.id, "h": _pin_hash_tag(msg)})
+
+def check_edit_token(msg: Message, token: str | None) -> bool:
+    if not token or not msg.pin_hash:
+        return False
+    try:
+        data = _edit_token_serializer.loads(token, max_age=EDIT_TOKEN_MAX_AGE)
+    except BadData:
+        return False
+    return data.get("m") == msg.id and hmac.compare_digest(str(data.get("h", "")), _pin_hash_tag(msg))
+
+def verify_pin_or_birthday(msg: Message, pin: str | None, is_birthday: bool, edit_token: str | None = None):
     if is_birthday:
         return True, None
+    # 토큰이 유효하면 KDF 없이 통과
+    if check_edit_token(msg, edit_token):
+        return True, None
     if not pin or not pin.isdigit() or len(pin) != 4:
         return False, "비밀번호(숫자 4자리)를 입력하세요."
     if not msg.pin_hash:
         return False, "이 메시지는 생성 시 비밀번호가 없어, 작성자 수정/삭제가 불가합니다. 생일자만 가능합니다."
+    # KDF 전에 시도 횟수 확인 (IP당 + 메시지당)
+    limiter.check("pin_ip", client_ip())
+    limiter.check("pin_message", str(msg.id))
     if not check_password_hash(msg.pin_hash, pin):
         return False, "비밀번호가 일치하지 않습니다."
     return True, None
@@ -172,62 +411,365 @@ def logout():
 # === letter 전용 사진 헬퍼 ===
 LETTER_PHOTOS_DIR = os.path.join(app.static_folder, "letter")
 
+# 사진 프레임(컨테이너 최대 1080px) 기준 표시 너비 힌트
+PHOTO_SIZES = "(max-width: 1080px) 100vw, 1080px"
+
+def _photo_item(url_of, f: str, mtime: int, derived_names: set, blob: str | None = None) -> dict:
+    """
+    사진 한 장의 템플릿 데이터. url_of(상대경로) → URL.
+    업로드 사진(blob 있음)은 불변 blob URL, 파생본이 있으면 srcset(WebP) / srcset_jpg(JPEG 폴백)를 채운다.
+    """
+    v = f"?v={mtime}" if mtime else ""
+    url = url_for("media_blob", blob=photo_store.blob_rel(blob)) if blob else url_of(f) + v
+    item = {"url": url, "name": f, "srcset": "", "srcset_jpg": "", "sizes": PHOTO_SIZES}
+    entries = srcset_entries(f, derived_names)
+    if entries:
+        item["srcset"] = ", ".join(f"{url_of(f'{DERIVED_DIRNAME}/{webp}')}{v} {w}w" for w, webp, _ in entries)
+        item["srcset_jpg"] = ", ".join(f"{url_of(f'{DERIVED_DIRNAME}/{jpg}')}{v} {w}w" for w, _, jpg in entries)
+    return item
+
+# 폴더 상태가 같으면 다른 워커가 읽어 둔 목록을 공유 캐시에서 가져온다
+catalog_cache = caches.namespace("photo-catalog", ttl=3600)
+media_catalog = PhotoCatalog(EDIT_PHOTOS_DIR, allowed, seed=ensure_edit_dir_seed, cache=catalog_cache)
+letter_catalog = PhotoCatalog(LETTER_PHOTOS_DIR, allowed, cache=catalog_cache)
+if instrumentation is not None:
+    from instrumentation import note_fs
+
+    media_catalog.on_fs = letter_catalog.on_fs = note_fs
+
 def list_letter_photos():
-    if not os.path.isdir(LETTER_PHOTOS_DIR):
-        return []
-    files = [f for f in os.listdir(LETTER_PHOTOS_DIR) if allowed(f)]
-    files.sort(key=lambda x: x.lower())
-    photos = []
-    for f in files:
-        try:
-            mtime = int(os.path.getmtime(os.path.join(LETTER_PHOTOS_DIR, f)))
-        except Exception:
-            mtime = 0
-        photos.append({
-            "url": url_for("static", filename=f"letter/{f}") + (f"?v={mtime}" if mtime else ""),
-            "name": f
-        })
-    return photos
+    files, derived_names = letter_catalog.snapshot()
+    url_of = lambda p: url_for("static", filename=f"letter/{p}")
+    return [_photo_item(url_of, f, mtime, derived_names) for f, mtime in files]
 
 def list_media_photos():
-    ensure_edit_dir_seed()
-    files = [f for f in os.listdir(EDIT_PHOTOS_DIR) if allowed(f)]
-    files.sort(key=lambda x: x.lower())
-    photos = []
-    for f in files:
-        try:
-            mtime = int(os.path.getmtime(os.path.join(EDIT_PHOTOS_DIR, f)))
-        except Exception:
-            mtime = 0
-        photos.append({
-            "url": url_for("media_file", filename=f) + (f"?v={mtime}" if mtime else ""),
-            "name": f
-        })
-    return photos
+    files, derived_names = media_catalog.snapshot()
+    blobs = photo_store.mapping()
+    url_of = lambda p: url_for("media_file", filename=p)
+    return [_photo_item(url_of, f, mtime, derived_names, blobs.get(f)) for f, mtime in files]
+
+def build_all_photo_derivatives() -> int:
+    """시드/편집/letter 사진 파생본을 한 번에 보장 (init_db 등에서 호출)."""
+    n = sum(
+        build_dir_derivatives(d, allowed)
+        for d in (SRC_PHOTOS_DIR, EDIT_PHOTOS_DIR, LETTER_PHOTOS_DIR)
+    )
+    media_catalog.invalidate()
+    letter_catalog.invalidate()
+    return n
+
+def invalidate_photo_views():
+    """편집 사진 폴더를 바꾼 핸들러가 호출: 카탈로그 + 메인 페이지 캐시"""
+    media_catalog.invalidate()
+    invalidate_index_cache()
+
+# ====== 방명록 페이지네이션 (keyset) ======
+GUESTBOOK_PAGE_SIZE = int(os.getenv("GUESTBOOK_PAGE_SIZE", "20"))
+GUESTBOOK_PAGE_MAX = 100
+
+def encode_message_cursor(msg: Message) -> str:
+    """페이지 마지막 메시지의 (created_at, id)를 불투명 커서 문자열로 만든다."""
+    raw = f"{msg.created_at.isoformat()}|{msg.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_message_cursor(cursor: str):
+    """커서 → (created_at, id). 형식이 잘못되면 ValueError."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        ts, msg_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(msg_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
 
-# ====== 메인 ======
-@app.route("/")
-def index():
+def fetch_message_page(cursor: str | None = None, limit: int = GUESTBOOK_PAGE_SIZE):
+    """
+    최신순 방명록 한 페이지와 다음 커서를 반환한다.
+    OFFSET 대신 (created_at, id) 기준 keyset 조건을 써서
+    ix_message_created_at_desc 인덱스를 타고 페이지 깊이와 무관하게 limit건만 읽는다.
+    """
+    limit = max(1, min(limit, GUESTBOOK_PAGE_MAX))
+    q = Message.query
+    if cursor:
+        ts, last_id = decode_message_cursor(cursor)
+        q = q.filter(or_(
+            Message.created_at < ts,
+            and_(Message.created_at == ts, Message.id < last_id),
+        ))
+    # limit+1건을 읽어 다음 페이지 존재 여부를 추가 쿼리 없이 판단
+    rows = q.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_message_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
+
+def message_to_dict(m: Message) -> dict:
+    return {
+        "message_id": m.id,
+        "nickname": m.nickname,
+        "text": m.text,
+        "created_at": m.created_at.isoformat() if m.created_at else None,
+        "like_count": m.like_count or 0,
+    }
+
+# ====== 메인 페이지 렌더 캐시 ======
+INDEX_CACHE_TTL = float(os.getenv("INDEX_CACHE_TTL", "60"))  # 초, 0이면 캐시 끔 (무효화는 콘텐츠 버전으로)
+SESSION_LIKED_SLOT = "__SESSION_LIKED__"
+
+# 키에 콘텐츠 버전이 들어가므로 어느 워커에서든 쓰기로 버전이 바뀌면 바로 미스가 난다.
+# (렌더 도중 쓰기가 끼어들어도 결과는 이미 지나간 버전 키로 저장되어 아무도 읽지 않는다)
+page_cache = caches.namespace("page", ttl=INDEX_CACHE_TTL)
+
+# ====== 방명록 카드 조각 캐시 ======
+# 카드는 그 메시지가 수정되거나(updated_at) 좋아요 수가 바뀔 때만 달라진다.
+# 보는 사람마다 다른 좋아요 상태는 슬롯으로 남겨 두고 꺼낼 때 채운다.
+LIKED_CLASS_SLOT = "__GB_LIKED_CLASS__"
+LIKED_PRESSED_SLOT = "__GB_LIKED_PRESSED__"
+# 카드 수십 개를 한 번에 꺼내므로 공유 저장소 왕복 없이 로컬 단만 (키에 stamp 포함 → 옛 항목은 LRU로 밀려남)
+card_cache = caches.namespace("card", shared=False)
+
+@app.template_global()
+@pass_context
+def gb_card(ctx, m: Message, liked: bool) -> Markup:
+    liked_class, liked_pressed = ("on", "true") if liked else ("", "false")
+    # 세션별 CSRF 토큰이 들어가는 환경이면 조각을 공유할 수 없다
+    if ctx.get("csrf_token") is not None:
+        return Markup(render_template("_gb_card.html", m=m, liked_class=liked_class, liked_pressed=liked_pressed))
+
+    key = f"{m.id}:{int(bool(g.is_birthday))}:{fingerprint(m.updated_at, m.like_count or 0, request.script_root)}"
+    html = card_cache.get(key)
+    if html is None:
+        html = render_template("_gb_card.html", m=m, liked_class=LIKED_CLASS_SLOT, liked_pressed=LIKED_PRESSED_SLOT)
+        card_cache.set(key, html)
+    return Markup(html.replace(LIKED_CLASS_SLOT, liked_class, 1).replace(LIKED_PRESSED_SLOT, liked_pressed, 1))
+
+# ====== 콘텐츠 버전 / 조건부 GET ======
+# 쓰기마다 스탬프 파일을 갱신 → 같은 호스트의 모든 워커가 작은 파일 하나를 읽어 최신 버전을 안다
+content_version = ContentVersion(
+    os.getenv("CONTENT_VERSION_FILE", os.path.join(app.instance_path, "content_version"))
+)
+# 좋아요 수 스탬프: 메인 페이지 본문(카운트)만 바뀌므로 전체 콘텐츠 버전과 분리한다.
+# replica 유예 판단에는 둘 다 쓴다 — 좋아요 직후 낡은 like_count가 새 버전 키로 캐시되지 않도록.
+like_counts_version = ContentVersion(
+    os.getenv("LIKE_COUNTS_VERSION_FILE", os.path.join(app.instance_path, "like_counts_version"))
+)
+# 배포 단위 지문: 템플릿이나 정적 매니페스트가 바뀌면 ETag도 바뀐다
+DEPLOY_FINGERPRINT = fingerprint(
+    tree_fingerprint(os.path.join(app.root_path, "templates")),
+    sorted((k, v.get("hash")) for k, v in _static_manifest.items()),
+)
+
+def replica_fresh_enough() -> bool:
+    """마지막 쓰기(글/사진 또는 좋아요) 후 REPLICA_MAX_LAG_SECONDS가 지났으면 replica에서 읽어도 된다."""
+    if not DATABASE_REPLICA_URL:
+        return False
+    last_write = max(content_version.current(), like_counts_version.current())
+    return time.time_ns() - last_write > REPLICA_MAX_LAG_SECONDS * 1e9
+
+RoutingSession.replica_allowed = staticmethod(replica_fresh_enough)
+
+def invalidate_index_cache():
+    """메인 페이지에 보이는 내용이 바뀌었을 때: 콘텐츠 버전 증가 (렌더 캐시 키가 바뀐다)"""
+    content_version.bump()
+
+def index_content_version() -> str:
+    return fingerprint(
+        DEPLOY_FINGERPRINT, content_version.current(), like_counts_version.current(), media_catalog.version()
+    )
+
+def not_modified(etag: str):
+    """If-None-Match가 맞으면 304 응답, 아니면 None"""
+    if request.if_none_match.contains_weak(etag):
+        return with_validators(Response(status=304), etag)
+    return None
+
+def with_validators(resp, etag: str):
+    resp.set_etag(etag, weak=True)
+    # 세션마다 다른 페이지이므로 공유 캐시 금지, 브라우저는 매번 재검증
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Cookie")
+    return resp
+
+def _render_index(session_liked: set, session_liked_json: str) -> str:
     photos = list_media_photos()
     note = BirthdayNote.query.first()
-    messages = Message.query.order_by(Message.created_at.desc()).all()
-    session_liked = set(session.get("liked_msgs", []))
+    messages, next_cursor = fetch_message_page()
     return render_template(
         "index.html",
         youtube_id=os.getenv("YOUTUBE_ID", "YG5qy6baxCA"),
         birthday_note=note,
         anon_messages=messages,
+        next_cursor=next_cursor,
         session_liked=session_liked,
+        session_liked_json=session_liked_json,
         birthday_username=os.getenv("BIRTHDAY_USERNAME", "birthday-user"),
         current_year=datetime.now().year,
         photos=photos,
     )
 
+# ====== 메인 ======
+@app.route("/")
+@read_only
+def index():
+    session_liked = visitor_liked_ids()
+    liked_json = json.dumps(sorted(session_liked))
+    has_flash = bool(session.get("_flashes"))
+
+    # 쿼리/렌더 전에 버전만으로 304 판단
+    version = index_content_version()
+    etag = fingerprint(version, g.is_birthday, sorted(session_liked))
+    if not has_flash:
+        resp = not_modified(etag)
+        if resp is not None:
+            return resp
+
+    # 1회성 flash가 담긴 응답은 재사용하면 안 되므로 ETag도 붙이지 않는다
+    if has_flash:
+        return _render_index(session_liked, liked_json)
+    # 생일자 화면은 세션마다 달라서 렌더 캐시하지 않는다
+    if g.is_birthday:
+        return with_validators(make_response(_render_index(session_liked, liked_json)), etag)
+
+    page_key = f"index:{fingerprint(version, request.script_root, app.config['LIVE_UPDATES'])}"
+    body = page_cache.get(page_key) if INDEX_CACHE_TTL > 0 else None
+    if body is None:
+        # 공용 본문은 '좋아요 안 누름' 상태로 렌더하고, 세션별 좋아요는 슬롯에 채운다
+        body = _render_index(set(), SESSION_LIKED_SLOT).encode("utf-8")
+        if INDEX_CACHE_TTL > 0:
+            page_cache.set(page_key, body)
+    body = body.replace(SESSION_LIKED_SLOT.encode("ascii"), liked_json.encode("utf-8"), 1)
+    resp = Response(body, mimetype="text/html")
+    compression = app.extensions.get("compression")
+    enc = compression.pick_encoding(len(body)) if compression is not None else None
+    if enc is not None and INDEX_CACHE_TTL > 0:
+        # 압축본도 인코딩별로 캐시해 적중마다 다시 압축하지 않는다. 좋아요 슬롯은 채운 뒤 압축하므로
+        # 좋아요가 없는 방문자(대부분)는 모두 한 항목을, 좋아요한 방문자는 자기 목록별 항목을 쓴다.
+        packed_key = f"{page_key}:{enc}" + (f":{fingerprint(liked_json)}" if session_liked else "")
+        packed = page_cache.get(packed_key)
+        if packed is None:
+            packed = compress_bytes(body, enc)
+            page_cache.set(packed_key, packed)
+        resp.set_data(packed)
+        resp.headers["Content-Encoding"] = enc
+        resp.vary.add("Accept-Encoding")
+    return with_validators(resp, etag)
+
+@app.get("/guestbook/messages")
+@read_only
+def list_messages():
+    """더 보기: 커서 다음 페이지를 카드 HTML 조각 + JSON 데이터로 반환"""
+    cursor = (request.args.get("cursor") or "").strip() or None
+    limit = request.args.get("limit", GUESTBOOK_PAGE_SIZE, type=int)
+    try:
+        messages, next_cursor = fetch_message_page(cursor, limit)
+    except ValueError:
+        return jsonify(ok=False, message="잘못된 커서입니다."), 400
+
+    html = render_template(
+        "_gb_cards.html",
+        anon_messages=messages,
+        session_liked=visitor_liked_ids(),
+    )
+    return jsonify(
+        ok=True,
+        html=html,
+        messages=[message_to_dict(m) for m in messages],
+        next_cursor=next_cursor,
+    )
+
+# ====== 방명록 검색 ======
+message_search = MessageSearch(app)
+
+@app.get("/guestbook/search")
+@read_only
+def search_messages():
+    """닉네임/본문 전문 검색: 관련도 순, cursor(다음 오프셋)로 페이지 이동"""
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify(ok=False, message="검색어를 입력하세요."), 400
+    limit = max(1, min(request.args.get("limit", GUESTBOOK_PAGE_SIZE, type=int), GUESTBOOK_PAGE_MAX))
+    try:
+        offset = int(request.args.get("cursor") or 0)
+        if offset < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify(ok=False, message="잘못된 커서입니다."), 400
+
+    messages, scores, has_more = message_search.search(q, offset, limit)
+    results = []
+    for m, score in zip(messages, scores):
+        item = message_to_dict(m)
+        item["score"] = round(score, 6)
+        results.append(item)
+    return jsonify(
+        ok=True,
+        query=q,
+        messages=results,
+        next_cursor=str(offset + limit) if has_more else None,
+    )
+
+@app.get("/guestbook/messages/<int:message_id>")
+@read_only
+def message_card(message_id):
+    """메시지 카드 하나 (실시간 피드에서 추가/수정된 카드를 끼워 넣을 때)"""
+    msg = Message.query.get_or_404(message_id)
+    html = render_template(
+        "_gb_cards.html",
+        anon_messages=[msg],
+        session_liked=visitor_liked_ids(),
+    )
+    return jsonify(ok=True, html=html, message=message_to_dict(msg))
+
+# ====== 실시간 피드 (SSE) ======
+# 구독자는 큐/스레드 없이 LiveFeed의 Condition에서 대기한다.
+# 그래도 WSGI 서버에서는 열린 탭마다 워커 스레드 하나를 최대 LIVE_MAX_STREAM_SECONDS 동안 잡는다.
+# 그래서 기본은 꺼 두고(페이지가 구독하지 않음, /live는 바로 503),
+#   - ASGI 진입점(asgi.py)이 LIVE_UPDATES를 켜고 /live를 이벤트 루프에서 직접 처리하거나
+#   - 연결당 스레드가 싼 서버(gevent 워커 등)에서 LIVE_SYNC_STREAM=true 로 켠다.
+LIVE_SYNC_STREAM = os.getenv("LIVE_SYNC_STREAM", "false").lower() == "true"
+app.config["LIVE_UPDATES"] = LIVE_SYNC_STREAM
+LIVE_RETRY_AFTER = 300
+LIVE_HEARTBEAT_SECONDS = 15
+LIVE_MAX_STREAM_SECONDS = int(os.getenv("LIVE_MAX_STREAM_SECONDS", "300"))  # 끊기면 브라우저가 자동 재연결
+
+live_feed = LiveFeed()
+if DATABASE_URL.startswith("postgresql") and os.getenv("LIVE_FEED_PG_NOTIFY", "false").lower() == "true":
+    live_feed.enable_pg_bridge(DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://", 1))
+
+@app.get("/live")
+def live_stream():
+    if not LIVE_SYNC_STREAM:
+        # 동기 워커를 붙잡지 않고 즉시 거절 (EventSource는 200이 아니면 재연결하지 않는다)
+        resp = Response("live updates are not enabled on this server\n", status=503, mimetype="text/plain")
+        resp.headers["Retry-After"] = str(LIVE_RETRY_AFTER)
+        return resp
+    last = live_feed.cursor_from_event_id(request.headers.get("Last-Event-ID"))
+
+    def stream(last):
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + LIVE_MAX_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            events, last = live_feed.wait(last, LIVE_HEARTBEAT_SECONDS)
+            if not events:
+                yield ": ping\n\n"
+                continue
+            for seq, event in events:
+                yield format_sse(live_feed.event_id(seq), event)
+
+    resp = Response(stream(last), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # Nginx 버퍼링 끄기
+    return resp
+
 # ====== 로컬 편집본 서빙 ======
 @app.route("/media_example/photos/<path:filename>")
 def media_file(filename):
     ensure_edit_dir_seed()
-    return send_from_directory(EDIT_PHOTOS_DIR, filename, conditional=True)
+    return media_sender.send("photos_edit", filename, max_age=app.get_send_file_max_age(filename))
+
+@app.route("/media_example/blobs/<path:blob>")
+def media_blob(blob):
+    # 내용 해시가 곧 이름이라 절대 바뀌지 않음 → 영구 캐시
+    return media_sender.send("blobs", blob, max_age=31536000, immutable=True)
 
 # ====== 생일자 메시지 저장 ======
 @app.post("/owner-note", endpoint="edit_birthday_note")
@@ -253,6 +795,7 @@ def edit_birthday_note():
         db.session.add(note)
 
     db.session.commit()
+    invalidate_index_cache()
     return json_or_redirect(True, "생일자 메시지가 저장되었습니다.")
 
 # ====== 사진 업로드/삭제/초기화 (로컬) ======
@@ -269,20 +812,41 @@ def upload_photo():
     if not allowed(f.filename):
         return json_or_redirect(False, "허용되지 않는 확장자입니다.")
 
+    try:
+        blob, created = photo_store.ingest(f)
+    except InvalidImage:
+        return json_or_redirect(False, "이미지 파일이 아닙니다.", status=400)
+    except Exception as e:
+        print("⚠️ upload store error:", e)
+        return json_or_redirect(False, "업로드 중 오류가 발생했습니다.", status=500)
+
+    existing = photo_store.name_for_blob(blob)
+    if existing and os.path.exists(os.path.join(EDIT_PHOTOS_DIR, existing)):
+        return json_or_redirect(False, f"이미 같은 사진이 있습니다. ({existing})", status=409)
+
     name = secure_filename(f.filename)
     target = os.path.join(EDIT_PHOTOS_DIR, name)
     if os.path.exists(target):
         root, ext = os.path.splitext(name)
-        name = f"{root}_{int(time.time())}{ext.lower()}"
+        name = f"{root}_{blob[:8]}{ext.lower()}"
         target = os.path.join(EDIT_PHOTOS_DIR, name)
 
     try:
-        f.save(target)
-        return json_or_redirect(True, "업로드 완료!")
+        photo_store.link(blob, target)
     except Exception as e:
         print("⚠️ upload save error:", e)
+        if created:
+            photo_store.discard(blob)  # 방금 만든 blob이 이름 없이 남지 않도록
         return json_or_redirect(False, "업로드 중 오류가 발생했습니다.", status=500)
 
+    try:
+        build_derivatives(EDIT_PHOTOS_DIR, name)
+    except Exception as e:
+        # 파생본 실패는 업로드 실패가 아님(원본으로 서빙)
+        print("⚠️ derivative build error:", e)
+    invalidate_photo_views()
+    return json_or_redirect(True, "업로드 완료!")
+
 @app.post("/photos/delete/<path:filename>")
 @require_birthday
 def delete_photo(filename):
@@ -294,6 +858,9 @@ def delete_photo(filename):
     if os.path.isfile(target):
         try:
             os.remove(target)
+            photo_store.unlink_name(filename)
+            remove_derivatives(EDIT_PHOTOS_DIR, filename)
+            invalidate_photo_views()
             return json_or_redirect(True, "삭제 완료!")
         except Exception as e:
             print("⚠️ delete error:", e)
@@ -301,44 +868,35 @@ def delete_photo(filename):
     else:
         return json_or_redirect(False, "파일이 존재하지 않습니다.", status=404)
 
-def _clear_dir(path: str):
-    """path 내부의 파일/디렉터리만 삭제 (path 자체는 유지)."""
-    if not os.path.isdir(path):
-        return
-    for root, dirs, files in os.walk(path, topdown=False):
-        for fname in files:
-            fp = os.path.join(root, fname)
-            try:
-                os.chmod(fp, 0o666)
-            except Exception:
-                pass
-            try:
-                os.remove(fp)
-            except Exception:
-                pass
-        for dname in dirs:
-            dp = os.path.join(root, dname)
-            try:
-                os.chmod(dp, 0o777)
-            except Exception:
-                pass
-            try:
-                os.rmdir(dp)
-            except Exception:
-                pass
-
-def _copy_dir_contents(src: str, dst: str):
-    """src의 내용물을 dst 최상위로 복사 (dst는 비어있다고 가정하지 않음)."""
-    if not os.path.isdir(src):
-        return
-    os.makedirs(dst, exist_ok=True)
-    for name in os.listdir(src):
-        s = os.path.join(src, name)
-        d = os.path.join(dst, name)
-        if os.path.isdir(s):
-            shutil.copytree(s, d, dirs_exist_ok=True)
+RESET_STAGING_PREFIX = f".{os.path.basename(EDIT_PHOTOS_DIR)}.reset-"
+RESET_STALE_SECONDS = 3600
+
+def _rmtree_error(func, path, exc):
+    # 예전 폴더의 파일은 시드/blob 원본과 inode를 공유하는 하드링크다.
+    # chmod로 읽기 전용을 풀면 원본 권한까지 바뀌므로 권한은 건드리지 않고 남은 것만 보고한다.
+    print("⚠️ remove old photo tree error:", path, exc)
+
+def _remove_tree_later(path: str):
+    """교체돼 나간 예전 폴더는 응답을 막지 않도록 백그라운드에서 지운다."""
+    def run():
+        if sys.version_info >= (3, 12):
+            shutil.rmtree(path, onexc=_rmtree_error)
         else:
-            shutil.copy2(s, d)
+            shutil.rmtree(path, onerror=lambda func, p, exc_info: _rmtree_error(func, p, exc_info[1]))
+    threading.Thread(target=run, name="photo-reset-cleanup", daemon=True).start()
+
+def _sweep_stale_staging():
+    """중간에 죽은 워커가 남긴 작업 폴더 정리 (다른 워커가 만드는 중일 수 있어 오래된 것만)."""
+    parent = os.path.dirname(EDIT_PHOTOS_DIR)
+    now = time.time()
+    try:
+        names = os.listdir(parent)
+    except OSError:
+        return
+    for name in names:
+        p = os.path.join(parent, name)
+        if name.startswith(RESET_STAGING_PREFIX) and now - os.path.getmtime(p) > RESET_STALE_SECONDS:
+            _remove_tree_later(p)
 
 @app.post("/photos/reset")
 @require_birthday
@@ -346,28 +904,46 @@ def reset_photos():
     if PORTFOLIO_MODE:
         return json_or_redirect(False, "포트폴리오 모드에서는 초기화가 비활성화되어 있습니다.", status=403)
 
-    # 1) 편집 폴더 보장
-    os.makedirs(EDIT_PHOTOS_DIR, exist_ok=True)
+    # 1) 옆 폴더에 원본(static/photos)을 하드링크로 복제 — 사진 크기와 무관하게 빠름
+    os.makedirs(os.path.dirname(EDIT_PHOTOS_DIR), exist_ok=True)
+    staging = os.path.join(
+        os.path.dirname(EDIT_PHOTOS_DIR),
+        f"{RESET_STAGING_PREFIX}{os.getpid()}-{time.time_ns()}",
+    )
+    try:
+        if os.path.isdir(SRC_PHOTOS_DIR):
+            clone_tree(SRC_PHOTOS_DIR, staging)
+        else:
+            os.makedirs(staging)
+    except Exception as e:
+        print("⚠️ clone_tree error:", e)
+        _remove_tree_later(staging)
+        return json_or_redirect(False, "원본 복구 중 오류가 발생했습니다.", status=500)
 
-    # 2) 내용물만 싹 비우기(디렉터리 자체는 삭제하지 않음)
+    # 2) 한 번에 바꿔 끼우기 (요청 중인 다른 사용자에게 반쯤 빈 폴더가 보이지 않음)
     try:
-        _clear_dir(EDIT_PHOTOS_DIR)
+        old = replace_dir(staging, EDIT_PHOTOS_DIR)
     except Exception as e:
-        print("⚠️ clear_dir error:", e)
+        print("⚠️ replace_dir error:", e)
+        _remove_tree_later(staging)
         return json_or_redirect(False, "초기화 중 오류가 발생했습니다.", status=500)
+    finally:
+        invalidate_photo_views()
 
-    # 3) 원본(static/photos)로 다시 채우기
+    # 3) 예전 폴더는 백그라운드 삭제, 사라진 업로드 이름의 blob 정리
+    if old:
+        _remove_tree_later(old)
+    _sweep_stale_staging()
     try:
-        if os.path.isdir(SRC_PHOTOS_DIR):
-            _copy_dir_contents(SRC_PHOTOS_DIR, EDIT_PHOTOS_DIR)
+        photo_store.prune(os.listdir(EDIT_PHOTOS_DIR))
     except Exception as e:
-        print("⚠️ copy_dir_contents error:", e)
-        return json_or_redirect(False, "원본 복구 중 오류가 발생했습니다.", status=500)
+        print("⚠️ photo store prune error:", e)
 
     return json_or_redirect(True, "초기 상태(원본)로 복구했습니다.")
 
 # ====== 방명록 ======
 @app.post("/guestbook/add")
+@rate_limit("add")
 def add_anon_message():
     nickname = (request.form.get("nickname") or "").strip() or "익명"
     text = (request.form.get("text") or "").strip()
@@ -380,21 +956,17 @@ def add_anon_message():
     if pin:
         if not (pin.isdigit() and len(pin) == 4):
             return json_or_redirect(False, "비밀번호는 숫자 4자리로 입력하세요.")
-        pin_hash = generate_password_hash(pin)
+        pin_hash = hash_pin(pin)
 
     msg = Message(nickname=nickname, text=text, created_at=datetime.now(), pin_hash=pin_hash)
     db.session.add(msg)
+    message_search.index(msg)
     db.session.commit()
+    invalidate_index_cache()
+    live_feed.publish("message.add", **message_to_dict(msg))
     notify_new_message(msg)
 
-    extra = {
-        "message_id": msg.id,
-        "nickname": msg.nickname,
-        "text": msg.text,
-        "created_at": msg.created_at.isoformat(),
-        "like_count": getattr(msg, "like_count", 0),
-    }
-    return json_or_redirect(True, "방명록이 등록되었습니다.", extra=extra)
+    return json_or_redirect(True, "방명록이 등록되었습니다.", extra=message_to_dict(msg))
 
 @app.post("/guestbook/<int:message_id>/verify")
 def verify_message_pin(message_id):
@@ -410,7 +982,10 @@ def verify_message_pin(message_id):
     if not ok:
         return json_or_redirect(False, err, status=400)
 
-    return json_or_redirect(True, "인증 성공")
+    # 이후 수정/삭제는 PIN 대신 이 토큰으로 (KDF 재계산 없음)
+    token = issue_edit_token(msg) if msg.pin_hash and not g.is_birthday else None
+    return json_or_redirect(True, "인증 성공", edit_token=token,
+                            edit_token_expires_in=EDIT_TOKEN_MAX_AGE if token else None)
 
 @app.post("/guestbook/<int:message_id>/update")
 def edit_anon_message_update(message_id):
@@ -421,22 +996,27 @@ def edit_anon_message_update(message_id):
         text = (data.get("text") or "").strip()
         nickname = (data.get("nickname") or "").strip()
         pin = (data.get("pin") or "").strip()
+        edit_token = (data.get("edit_token") or "").strip()
     else:
         text = (request.form.get("text") or "").strip()
         nickname = (request.form.get("nickname") or "").strip()
         pin = (request.form.get("pin") or "").strip()
+        edit_token = (request.form.get("edit_token") or "").strip()
 
     if not text:
         return json_or_redirect(False, "메시지를 입력하세요.", status=400)
 
-    ok, err = verify_pin_or_birthday(msg, pin, g.is_birthday)
+    ok, err = verify_pin_or_birthday(msg, pin, g.is_birthday, edit_token)
     if not ok:
         return json_or_redirect(False, err, status=400)
 
     if nickname:
         msg.nickname = nickname
     msg.text = text
+    message_search.index(msg)
     db.session.commit()
+    invalidate_index_cache()
+    live_feed.publish("message.update", **message_to_dict(msg))
     notify_update_message(msg)
 
     return json_or_redirect(True, "수정되었습니다.")
@@ -447,70 +1027,116 @@ def delete_anon_message(message_id):
     if request.is_json:
         data = request.get_json(silent=True) or {}
         pin = (data.get("pin") or "").strip()
+        edit_token = (data.get("edit_token") or "").strip()
     else:
         pin = (request.form.get("pin") or "").strip()
+        edit_token = (request.form.get("edit_token") or "").strip()
 
-    ok, err = verify_pin_or_birthday(msg, pin, g.is_birthday)
+    ok, err = verify_pin_or_birthday(msg, pin, g.is_birthday, edit_token)
     if not ok:
         return json_or_redirect(False, err, status=400)
 
     db.session.delete(msg)
+    message_search.remove(message_id)
     db.session.commit()
+    like_ledger.forget_message(message_id)
+    invalidate_index_cache()
+    live_feed.publish("message.delete", message_id=message_id)
     notify_delete_message(message_id, nick=msg.nickname or "(익명)")
     return json_or_redirect(True, "삭제되었습니다.", extra={"message_id": message_id})
 
 # ====== 좋아요(세션당 1회) & 언좋아요 ======
-def _get_session_liked_set():
-    return set(session.get("liked_msgs", []))
-
-def _save_session_liked_set(s):
-    session["liked_msgs"] = list(s)
+# LIKE_FLUSH_MS > 0 이면 write-behind(메모리에 합산 후 주기적 배치 반영)
+like_engine = LikeEngine(app, flush_ms=int(os.getenv("LIKE_FLUSH_MS", "0")))
+
+def _on_likes_flushed(changed: dict):
+    like_counts_version.bump()
+    for message_id, count in changed.items():
+        live_feed.publish("like", message_id=message_id, count=count)
+
+like_engine.on_flush = _on_likes_flushed
+
+# 좋아요 기록은 서버 장부(message_like)에, 쿠키에는 짧은 익명 방문자 id만
+like_ledger = LikeLedger(max_visitors=int(os.getenv("LIKE_LEDGER_CACHE_SIZE", "10000")))
+VISITOR_SESSION_KEY = "vid"
+LIKE_VERSION_SESSION_KEY = "lv"  # 이 방문자의 좋아요가 바뀔 때만 증가 → 장부 캐시 키
+
+def current_visitor_id(create: bool = False) -> str | None:
+    vid = session.get(VISITOR_SESSION_KEY)
+    legacy = session.get("liked_msgs")
+    if vid is None and (create or legacy):
+        vid = session[VISITOR_SESSION_KEY] = secrets.token_urlsafe(12)
+    if legacy is not None:
+        # 예전 쿠키에 쌓인 목록은 한 번 장부로 옮기고 쿠키에서 뺀다
+        like_ledger.add_many(vid, legacy)
+        session.pop("liked_msgs", None)
+    return vid
+
+def visitor_liked_ids() -> frozenset:
+    return like_ledger.liked_ids(current_visitor_id(), session.get(LIKE_VERSION_SESSION_KEY, 0))
+
+class _MessageMissing(Exception):
+    pass
+
+def toggle_like(message_id: int, liked: bool):
+    """
+    장부 기록과 좋아요 수 반영을 한 트랜잭션으로 (즉시 모드).
+    write-behind 모드에서는 장부만 커밋하고 delta는 엔진이 모아서 반영한다.
+    """
+    vid = current_visitor_id(create=liked)
+    if like_engine.write_behind:
+        if like_engine.current(message_id) is None:
+            abort(404)
+        changed = False
+        if vid:
+            with db.engine.begin() as conn:
+                changed = like_ledger.record(conn, vid, message_id, liked)
+        count = like_engine.apply(message_id, 1 if liked else -1) if changed else like_engine.current(message_id)
+    else:
+        try:
+            with db.engine.begin() as conn:
+                changed = bool(vid) and like_ledger.record(conn, vid, message_id, liked)
+                if changed:
+                    count = like_engine.apply_in(conn, message_id, 1 if liked else -1)
+                    if count is None:
+                        raise _MessageMissing  # 롤백 (장부 기록도 취소)
+        except (_MessageMissing, IntegrityError):  # 없는 메시지 (FK 위반 포함)
+            abort(404)
+        if changed:
+            like_engine.notify({message_id: count})
+        else:
+            count = like_engine.current(message_id)
+    if count is None:
+        abort(404)
+    if changed:
+        like_ledger.forget_visitor(vid)
+        session[LIKE_VERSION_SESSION_KEY] = session.get(LIKE_VERSION_SESSION_KEY, 0) + 1
+    return jsonify(ok=True, liked=liked, count=count)
 
 @app.post("/messages/<int:message_id>/like")
+@rate_limit("like")
 def like_message(message_id):
-    msg = Message.query.get_or_404(message_id)
-    liked_set = _get_session_liked_set()
-    if message_id in liked_set:
-        return jsonify(ok=True, liked=True, count=msg.like_count or 0)
-    if msg.like_count is None:
-        msg.like_count = 0
-    msg.like_count += 1
-    db.session.commit()
-    liked_set.add(message_id)
-    _save_session_liked_set(liked_set)
-    return jsonify(ok=True, liked=True, count=msg.like_count or 0)
+    return toggle_like(message_id, liked=True)
 
 @app.post("/messages/<int:message_id>/unlike")
+@rate_limit("like")
 def unlike_message(message_id):
-    msg = Message.query.get_or_404(message_id)
-    liked_set = _get_session_liked_set()
-    if message_id not in liked_set:
-        return jsonify(ok=True, liked=False, count=msg.like_count or 0)
-    if msg.like_count is None:
-        msg.like_count = 0
-    msg.like_count = max(0, msg.like_count - 1)
-    db.session.commit()
-    liked_set.remove(message_id)
-    _save_session_liked_set(liked_set)
-    return jsonify(ok=True, liked=False, count=msg.like_count or 0)
+    return toggle_like(message_id, liked=False)
 
 # ====== 기타 ======
 @app.get("/letter")
 @require_birthday
+@read_only
 def letter_view():
+    etag = fingerprint(DEPLOY_FINGERPRINT, letter_catalog.version())
+    has_flash = bool(session.get("_flashes"))
+    if not has_flash:
+        resp = not_modified(etag)
+        if resp is not None:
+            return resp
     photos = list_letter_photos()
-    return render_template("letter.html", photos=photos)
-
-@app.after_request
-def add_static_cache_headers(resp):
-    try:
-        p = request.path or ""
-    except Exception:
-        return resp
-    static_prefix = (app.static_url_path or "/static_example") + "/"
-    if p.startswith(static_prefix):
-        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
-    return resp
+    resp = make_response(render_template("letter.html", photos=photos))
+    return resp if has_flash else with_validators(resp, etag)
 
 @app.teardown_appcontext
 def shutdown_session(exception=None):
@@ -519,23 +1145,22 @@ def shutdown_session(exception=None):
     except Exception:
         pass
 
+# 프로세스당 디스패처 하나: 제한 큐 + 고정 워커 + 재시도 + 짧은 시간 내 알림 묶기
+slack_dispatcher = SlackDispatcher(
+    url=os.getenv("SLACK_WEBHOOK_URL", ""),
+    workers=int(os.getenv("SLACK_WORKERS", "2")),
+    maxsize=int(os.getenv("SLACK_QUEUE_SIZE", "256")),
+    coalesce_window=float(os.getenv("SLACK_COALESCE_SECONDS", "2")),
+)
+
 def _notify_slack(text: str):
     # 포트폴리오/로컬 데모에서는 슬랙 전송 차단
     if PORTFOLIO_MODE:
         return
-    url = os.getenv("SLACK_WEBHOOK_URL", "")
-    if not url:
-        return
-    try:
-        import urllib.request
-        data = json.dumps({"text": text}).encode("utf-8")
-        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
-        urllib.request.urlopen(req, timeout=3).read()
-    except Exception as e:
-        print("⚠️ slack notify error:", e)
+    slack_dispatcher.submit(text)
 
 def notify_new_message(m):
-    """방명록 등록 시 Slack으로 비동기 알림"""
+    """방명록 등록 시 Slack으로 비동기 알림 (디스패처 큐에 넣고 즉시 반환)"""
     made = m.created_at.strftime("%Y-%m-%d %H:%M") if getattr(m, "created_at", None) else ""
     nick = m.nickname or "익명"
     text = (m.text or "").strip()
@@ -547,11 +1172,7 @@ def notify_new_message(m):
         f"- 시간: {made}\n"
         f"- 내용:\n{text_short}"
     )
-
-    def worker():
-        _notify_slack(slack_text)
-
-    threading.Thread(target=worker, daemon=True).start()
+    _notify_slack(slack_text)
 
 def notify_update_message(m):
     """방명록 수정 시 Slack 알림"""
@@ -566,7 +1187,7 @@ def notify_update_message(m):
         f"- 시간: {made}\n"
         f"- 수정 후 내용:\n{text_short}"
     )
-    threading.Thread(target=lambda: _notify_slack(slack_text), daemon=True).start()
+    _notify_slack(slack_text)
 
 def notify_delete_message(m_id, nick="(알 수 없음)"):
     """방명록 삭제 시 Slack 알림"""
@@ -577,7 +1198,100 @@ def notify_delete_message(m_id, nick="(알 수 없음)"):
         f"- 시간: {made}\n"
         f"- 작성자: {nick}"
     )
-    threading.Thread(target=lambda: _notify_slack(slack_text), daemon=True).start()
+    _notify_slack(slack_text)
+
+# ====== 시작 준비 (app factory) ======
+# Gunicorn:  gunicorn -c gunicorn.conf.py   (preload_app=True, wsgi_app="app:create_app()")
+# 무거운 1회성 준비를 마스터에서 fork 전에 한 번만 하고, 워커는 copy-on-write로 결과를 물려받는다.
+STARTUP_SECONDS = {}  # {단계: 초} — 콜드 스타트 추적용 (/metrics, 로그)
+_warmed = False
+
+def _timed(phase: str, fn, *args):
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    except Exception as e:
+        print(f"⚠️ startup {phase} error:", e)
+    finally:
+        STARTUP_SECONDS[phase] = time.perf_counter() - t0
+
+def _hash_template_assets() -> int:
+    """템플릿이 static_v('...')로 쓰는 파일의 해시를 미리 계산 (매니페스트가 없는 개발 환경)"""
+    if IS_PROD:
+        return 0  # 운영은 매니페스트만 쓴다
+    names = set()
+    for dirpath, _dirs, files in os.walk(os.path.join(app.root_path, "templates")):
+        for name in files:
+            with open(os.path.join(dirpath, name), encoding="utf-8") as f:
+                names.update(re.findall(r"static_v\(\s*['\"]([^'\"]+)['\"]", f.read()))
+    for name in names:
+        if name not in _static_manifest:
+            _digest_of_static(name)
+    return len(names)
+
+# 실제로 렌더하는 템플릿만 (templates/ 에는 쓰지 않는 옛 파일도 있다)
+WARM_TEMPLATES = ("base.html", "index.html", "_gb_cards.html", "_gb_card.html", "letter.html", "login.html")
+
+def _compile_templates():
+    for name in WARM_TEMPLATES:
+        try:
+            app.jinja_env.get_template(name)
+        except Exception as e:  # 한 파일이 깨져도 나머지는 컴파일
+            print(f"⚠️ template compile error ({name}):", e)
+
+def _check_search_index():
+    with app.app_context():
+        message_search.is_ready()
+
+def dispose_db_engines(close: bool = True):
+    """
+    풀 커넥션 정리. fork 전(부모)에는 close=True로 닫고,
+    fork 직후(자식)에는 close=False — 부모와 공유하는 소켓을 건드리지 않고 풀만 버린다.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+# 어떤 서버가 fork하든(Gunicorn, uWSGI, multiprocessing) 자식은 부모 커넥션을 물려 쓰지 않는다
+os.register_at_fork(after_in_child=lambda: dispose_db_engines(close=False))
+
+def create_app(warm: bool = True):
+    """
+    WSGI 진입점. warm이면 사진 폴더 시드, 템플릿 컴파일, 정적 자산 해시, 사진 목록,
+    검색 인덱스 확인을 미리 해 두고 시작 시간을 기록한다. 여러 번 불러도 준비는 한 번만.
+    """
+    global _warmed
+    if warm and not _warmed:
+        STARTUP_SECONDS["import"] = time.perf_counter() - _STARTUP_T0
+        t0 = time.perf_counter()
+        _timed("seed_photos", ensure_edit_dir_seed)
+        _timed("templates", _compile_templates)
+        _timed("static_hash", _hash_template_assets)
+        _timed("photo_catalog", lambda: (media_catalog.snapshot(), letter_catalog.snapshot(), photo_store.mapping()))
+        _timed("search_index", _check_search_index)
+        _timed("dispose_db", dispose_db_engines)
+        STARTUP_SECONDS["warm"] = time.perf_counter() - t0
+        _warmed = True
+        print(
+            f"🚀 startup ready in {(STARTUP_SECONDS['import'] + STARTUP_SECONDS['warm']) * 1000:.0f}ms "
+            f"(import {STARTUP_SECONDS['import'] * 1000:.0f}ms, warm {STARTUP_SECONDS['warm'] * 1000:.0f}ms: "
+            + ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in STARTUP_SECONDS.items() if k not in ("import", "warm"))
+            + ")"
+        )
+    return app
+
+def startup_metrics_lines() -> list[str]:
+    out = [
+        "# HELP hbd_startup_seconds Cold start time by phase (import, warm-up steps).",
+        "# TYPE hbd_startup_seconds gauge",
+    ]
+    for phase, secs in STARTUP_SECONDS.items():
+        out.append(f'hbd_startup_seconds{{phase="{phase}"}} {secs:.6f}')
+    return out
+
+if instrumentation is not None:
+    instrumentation.add_collector(startup_metrics_lines)
 
 if __name__ == "__main__":
+    create_app()
     app.run(host="0.0.0.0", port=5001, debug=False, use_reloader=True)
\ No newline at end of file
@@ -0,0 +1,121 @@
+# archive.py
+"""
+방명록 아카이브: Message / BirthdayNote / PrivateLetter 를 JSONL로 내보내고 다시 넣는다.
+
+한 줄에 한 행: {"table": "message", "row": {...}}
+
+- 내보내기: stream_results(서버 측 커서, Postgres는 named cursor)로 yield_per 건씩 읽어
+  바로 파일에 쓴다. 행 수와 무관하게 메모리 사용이 일정하다.
+- 가져오기: 줄 단위로 읽어 테이블별 batch_size 건씩 모아 executemany(INSERT 한 번에 여러 VALUES)
+  로 넣는다. 전체가 한 트랜잭션이라 중간에 실패하면 아무것도 바뀌지 않는다.
+
+init_db.py export / import 서브커맨드에서 사용한다.
+"""
+import json
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import DateTime, delete, func, insert, select, text
+
+from models import BirthdayNote, Message, PrivateLetter, db
+
+ARCHIVE_TABLES = {
+    m.__tablename__: m.__table__ for m in (Message, BirthdayNote, PrivateLetter)
+}
+
+
+def _encode(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def export_jsonl(path: str, tables=None, yield_per: int = 5000) -> dict:
+    """테이블별 내보낸 행 수 반환. path가 '-'면 표준출력."""
+    tables = tables or list(ARCHIVE_TABLES)
+    counts = {}
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", buffering=1 << 20)
+    try:
+        with db.engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, yield_per=yield_per)
+            for name in tables:
+                table = ARCHIVE_TABLES[name]
+                cols = [c.name for c in table.columns]
+                n = 0
+                result = conn.execute(select(table).order_by(table.c.id))
+                for part in result.partitions():
+                    out.write("".join(
+                        json.dumps({"table": name, "row": {k: _encode(v) for k, v in zip(cols, row)}},
+                                   ensure_ascii=False) + "\n"
+                        for row in part
+                    ))
+                    n += len(part)
+                counts[name] = n
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return counts
+
+
+def import_jsonl(path: str, batch_size: int = 5000, replace: bool = False, renumber: bool = False) -> dict:
+    """
+    JSONL을 넣는다. 테이블별 넣은 행 수 반환.
+    replace=True면 파일에 나오는 테이블을 먼저 비운다(같은 트랜잭션).
+    renumber=True면 id를 버리고 새로 매긴다(기존 데이터에 덧붙일 때).
+    """
+    dt_cols = {
+        name: {c.name for c in t.columns if isinstance(c.type, DateTime)}
+        for name, t in ARCHIVE_TABLES.items()
+    }
+    counts = {}
+    pending = {}  # {table name: [row, ...]}
+    cleared = set()
+
+    def flush(conn, name):
+        rows = pending.pop(name, None)
+        if rows:
+            conn.execute(insert(ARCHIVE_TABLES[name]), rows)
+            counts[name] = counts.get(name, 0) + len(rows)
+
+    with db.engine.begin() as conn, open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+                name, row = rec["table"], rec["row"]
+                table = ARCHIVE_TABLES[name]
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"{path}:{lineno}: bad record ({e})") from e
+
+            if replace and name not in cleared:
+                conn.execute(delete(table))
+                cleared.add(name)
+            row = {k: v for k, v in row.items() if k in table.c}
+            if renumber:
+                row.pop("id", None)
+            for k in dt_cols[name]:
+                if row.get(k):
+                    row[k] = datetime.fromisoformat(row[k])
+            batch = pending.setdefault(name, [])
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(conn, name)
+        for name in list(pending):
+            flush(conn, name)
+        if conn.dialect.name == "postgresql" and not renumber:
+            _reset_sequences(conn, counts)
+    return counts
+
+
+def _reset_sequences(conn, tables):
+    """id를 그대로 넣었으면 시퀀스를 max(id) 뒤로 옮겨 이후 INSERT가 충돌하지 않게 한다."""
+    for name in tables:
+        table = ARCHIVE_TABLES[name]
+        max_id = conn.execute(select(func.max(table.c.id))).scalar()
+        if max_id:
+            conn.execute(
+                text("SELECT setval(pg_get_serial_sequence(:t, 'id'), :v)"),
+                {"t": name, "v": max_id},
+            )
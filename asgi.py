@@ -0,0 +1,337 @@
+# asgi.py
+"""
+ASGI 진입점 (선택 배포 모드).
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:application --workers 2 --proxy-headers
+
+I/O 대기가 긴 경로는 이벤트 루프에서 async DB 드라이버(aiosqlite / asyncpg)로 직접 처리한다.
+  GET  /live                        SSE — 열린 탭마다 워커/스레드를 잡지 않는다
+  POST /messages/<id>/like|unlike   좋아요 (장부 INSERT/DELETE + like_count UPDATE)
+  GET  /guestbook/search            검색 JSON
+  POST /guestbook/add               방명록 등록
+그 밖의 모든 라우트(템플릿 페이지, PIN 검증/수정/삭제, 업로드, 미디어)는 기존 Flask app을
+스레드 풀에서 그대로 돌린다(a2wsgi). 세션 쿠키는 Flask 것을 그대로 읽고 쓴다.
+
+캐시 무효화, 실시간 피드, Slack 알림은 같은 프로세스의 app 모듈 객체를 공유한다.
+"""
+import asyncio
+import os
+import secrets
+from datetime import datetime
+from types import SimpleNamespace
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    GUESTBOOK_PAGE_MAX, GUESTBOOK_PAGE_SIZE, LIVE_HEARTBEAT_SECONDS, LIVE_MAX_STREAM_SECONDS,
+    LIKE_VERSION_SESSION_KEY, VISITOR_SESSION_KEY, app as flask_app, db, hash_pin, invalidate_index_cache, like_engine,
+    like_ledger, limiter, live_feed, message_search, message_to_dict, notify_new_message,
+)
+from like_ledger import delete_stmt, insert_ignore_stmt
+from likes import _like_update_stmt
+from live_feed import AsyncWaiter, format_sse
+from models import Message
+from ratelimit import RateLimited
+from search import FTS_INSERT, MAX_RESULTS, query_terms, search_statement
+
+_message = Message.__table__
+_like_update = _like_update_stmt()
+
+# /live를 이 진입점이 이벤트 루프에서 처리하므로 페이지가 실시간 피드를 구독하게 한다
+flask_app.config["LIVE_UPDATES"] = True
+
+
+# ====== async DB 엔진 ======
+def async_engine_from(sync_url):
+    """Flask-SQLAlchemy가 해석한 URL(상대 SQLite 경로 → instance/)을 async 드라이버로 바꾼다."""
+    if sync_url.get_backend_name() == "sqlite":
+        return create_async_engine(sync_url.set(drivername="sqlite+aiosqlite"))
+    if sync_url.get_backend_name() == "postgresql":
+        return create_async_engine(
+            sync_url.set(drivername="postgresql+asyncpg", query={}),
+            connect_args={"server_settings": {"search_path": "hbd"}},
+            pool_size=int(os.getenv("ASYNC_DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "2")),
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+    raise RuntimeError(f"ASGI 모드는 sqlite/postgresql만 지원합니다: {sync_url.drivername}")
+
+
+# ====== Flask 세션 쿠키 공유 ======
+class FlaskSession:
+    """Flask의 서명 쿠키 세션을 그대로 읽고 쓴다 (WSGI 쪽 라우트와 같은 세션)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.serializer = app.session_interface.get_signing_serializer(app)
+        self.cookie_name = app.config["SESSION_COOKIE_NAME"]
+
+    def load(self, request: Request) -> dict:
+        raw = request.cookies.get(self.cookie_name)
+        if not raw:
+            return {}
+        max_age = int(self.app.permanent_session_lifetime.total_seconds())
+        try:
+            return dict(self.serializer.loads(raw, max_age=max_age))
+        except BadSignature:
+            return {}
+
+    def save(self, response, data: dict):
+        cfg = self.app.config
+        response.set_cookie(
+            self.cookie_name,
+            self.serializer.dumps(data),
+            path=cfg.get("SESSION_COOKIE_PATH") or cfg.get("APPLICATION_ROOT") or "/",
+            domain=cfg.get("SESSION_COOKIE_DOMAIN") or None,
+            secure=bool(cfg.get("SESSION_COOKIE_SECURE")),
+            httponly=bool(cfg.get("SESSION_COOKIE_HTTPONLY")),
+            samesite=cfg.get("SESSION_COOKIE_SAMESITE") or "lax",
+        )
+
+
+flask_session = FlaskSession(flask_app)
+
+
+def wants_json(request: Request) -> bool:
+    """app.is_json_request 와 같은 규칙"""
+    if "application/json" in (request.headers.get("content-type") or "").lower():
+        return True
+    return "application/json" in (request.headers.get("accept") or "").lower()
+
+
+def json_or_redirect(request: Request, sess: dict, ok: bool, msg: str, status: int = 200, **extra):
+    """app.json_or_redirect 의 ASGI 버전: JSON이 아니면 flash를 세션에 넣고 메인으로."""
+    if wants_json(request):
+        resp = JSONResponse({"ok": ok, "message": msg, **extra}, status_code=status)
+    else:
+        sess.setdefault("_flashes", []).append(("success" if ok else "error", msg))
+        resp = RedirectResponse(request.scope.get("root_path", "") + "/", status_code=302)
+        flask_session.save(resp, sess)
+    return resp
+
+
+# ====== 요청 속도 제한 (app.limiter 공유) ======
+async def throttle(request: Request, rule: str):
+    """클라이언트 IP 기준 (uvicorn --proxy-headers 가 프록시 뒤의 실제 주소를 채운다)"""
+    key = request.client.host if request.client else "-"
+    if limiter.in_memory:
+        limiter.check(rule, key)
+    else:
+        await asyncio.to_thread(limiter.check, rule, key)  # 공유 저장소 왕복은 루프 밖에서
+
+
+async def on_rate_limited(request: Request, exc: RateLimited):
+    resp = json_or_redirect(request, flask_session.load(request), False,
+                            "요청이 너무 많습니다. 잠시 후 다시 시도하세요.", status=429)
+    resp.headers["Retry-After"] = str(exc.retry_after)
+    return resp
+
+
+# ====== 실시간 피드 (SSE) ======
+async def live_stream(request: Request):
+    last = live_feed.cursor_from_event_id(request.headers.get("last-event-id"))
+    waiter = request.app.state.live_waiter
+
+    async def stream(last):
+        yield "retry: 3000\n\n"
+        deadline = asyncio.get_running_loop().time() + LIVE_MAX_STREAM_SECONDS
+        while asyncio.get_running_loop().time() < deadline:
+            events, last = await waiter.wait(last, LIVE_HEARTBEAT_SECONDS)
+            if not events:
+                yield ": ping\n\n"
+                continue
+            for seq, event in events:
+                yield format_sse(live_feed.event_id(seq), event)
+
+    return StreamingResponse(
+        stream(last),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ====== 좋아요 ======
+async def _apply_like(conn, message_id: int, delta: int):
+    args = {"mid": message_id, "delta": delta}
+    if conn.dialect.update_returning:
+        row = (await conn.execute(_like_update.returning(_message.c.like_count), args)).first()
+        return row[0] if row else None
+    await conn.execute(_like_update, args)
+    return (await conn.execute(select(_message.c.like_count).where(_message.c.id == message_id))).scalar()
+
+
+async def _toggle_like(request: Request, liked: bool):
+    await throttle(request, "like")
+    message_id = request.path_params["message_id"]
+    engine = request.app.state.db
+    sess = flask_session.load(request)
+    vid = sess.get(VISITOR_SESSION_KEY)
+    new_visitor = vid is None and liked
+    if new_visitor:
+        vid = sess[VISITOR_SESSION_KEY] = secrets.token_urlsafe(12)
+
+    changed = None
+    async with engine.begin() as conn:
+        row = (await conn.execute(select(_message.c.like_count).where(_message.c.id == message_id))).first()
+        if row is None:
+            return JSONResponse({"ok": False, "message": "메시지가 없습니다."}, status_code=404)
+        count = row[0] or 0
+        if vid:
+            if liked:
+                stmt = insert_ignore_stmt(conn.dialect.name, {"visitor_id": vid, "message_id": message_id})
+            else:
+                stmt = delete_stmt(vid, message_id)
+            if (await conn.execute(stmt)).rowcount == 1:
+                changed = 1 if liked else -1
+                if not like_engine.write_behind:
+                    count = await _apply_like(conn, message_id, changed)
+
+    if changed is not None:
+        like_ledger.forget_visitor(vid)
+        sess[LIKE_VERSION_SESSION_KEY] = sess.get(LIKE_VERSION_SESSION_KEY, 0) + 1  # 이 방문자의 장부 캐시 키
+        if like_engine.write_behind:
+            count = await asyncio.to_thread(_run_in_app, like_engine.apply, message_id, changed)
+        else:
+            # 좋아요 수 스탬프 + 실시간 피드 (PG NOTIFY는 블로킹이라 스레드에서)
+            await asyncio.to_thread(like_engine.on_flush, {message_id: count})
+    elif like_engine.write_behind:
+        count = await asyncio.to_thread(_run_in_app, like_engine.current, message_id)
+
+    resp = JSONResponse({"ok": True, "liked": liked, "count": count})
+    if new_visitor or changed is not None:
+        flask_session.save(resp, sess)
+    return resp
+
+
+async def like_message(request: Request):
+    return await _toggle_like(request, liked=True)
+
+
+async def unlike_message(request: Request):
+    return await _toggle_like(request, liked=False)
+
+
+def _run_in_app(fn, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+# ====== 검색 ======
+async def search_messages(request: Request):
+    q = (request.query_params.get("q") or "").strip()
+    if not q:
+        return JSONResponse({"ok": False, "message": "검색어를 입력하세요."}, status_code=400)
+    try:
+        limit = int(request.query_params.get("limit") or GUESTBOOK_PAGE_SIZE)
+        offset = int(request.query_params.get("cursor") or 0)
+        if offset < 0:
+            raise ValueError
+    except ValueError:
+        return JSONResponse({"ok": False, "message": "잘못된 커서입니다."}, status_code=400)
+    limit = max(1, min(limit, GUESTBOOK_PAGE_MAX))
+
+    terms = query_terms(q)
+    results, has_more = [], False
+    if terms and offset < MAX_RESULTS:
+        limit = min(limit, MAX_RESULTS - offset)
+        sql, params = search_statement(request.app.state.search_dialect, terms, offset, limit)
+        async with request.app.state.db.connect() as conn:
+            rows = (await conn.execute(sql, params)).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            ids = [r.id for r in rows]
+            by_id = {
+                m.id: m for m in (await conn.execute(select(_message).where(_message.c.id.in_(ids)))).all()
+            } if ids else {}
+        for r in rows:
+            if r.id in by_id:
+                item = message_to_dict(by_id[r.id])
+                item["score"] = round(float(r.score), 6)
+                results.append(item)
+    return JSONResponse({
+        "ok": True,
+        "query": q,
+        "messages": results,
+        "next_cursor": str(offset + limit) if has_more else None,
+    })
+
+
+# ====== 방명록 등록 ======
+async def add_anon_message(request: Request):
+    await throttle(request, "add")
+    sess = flask_session.load(request)
+    if "application/json" in (request.headers.get("content-type") or "").lower():
+        data = await request.json()
+    else:
+        data = await request.form()
+    nickname = (data.get("nickname") or "").strip() or "익명"
+    text = (data.get("text") or "").strip()
+    pin = (data.get("pin") or "").strip()
+
+    if not text:
+        return json_or_redirect(request, sess, False, "메시지를 입력하세요.")
+    pin_hash = None
+    if pin:
+        if not (pin.isdigit() and len(pin) == 4):
+            return json_or_redirect(request, sess, False, "비밀번호는 숫자 4자리로 입력하세요.")
+        pin_hash = await asyncio.to_thread(hash_pin, pin)  # KDF는 CPU 작업 → 루프 밖에서
+
+    now = datetime.now()
+    async with request.app.state.db.begin() as conn:
+        result = await conn.execute(insert(_message).values(
+            nickname=nickname, text=text, created_at=now, pin_hash=pin_hash, like_count=0,
+        ))
+        message_id = result.inserted_primary_key[0]
+        if request.app.state.search_dialect == "sqlite":
+            await conn.execute(FTS_INSERT, {"id": message_id, "nickname": nickname, "text": text})
+
+    msg = SimpleNamespace(id=message_id, nickname=nickname, text=text, created_at=now, like_count=0)
+    await asyncio.to_thread(_after_add, msg)
+    return json_or_redirect(request, sess, True, "방명록이 등록되었습니다.", extra=message_to_dict(msg))
+
+
+def _after_add(msg):
+    invalidate_index_cache()
+    live_feed.publish("message.add", **message_to_dict(msg))
+    notify_new_message(msg)
+
+
+# ====== 앱 ======
+async def on_startup():
+    def inspect():
+        with flask_app.app_context():
+            return db.engine.url, (message_search.dialect if message_search.is_ready() else None)
+
+    sync_url, search_dialect = await asyncio.to_thread(inspect)
+    application.state.db = async_engine_from(sync_url)
+    application.state.search_dialect = search_dialect
+    application.state.live_waiter = AsyncWaiter(live_feed, asyncio.get_running_loop())
+
+
+async def on_shutdown():
+    await application.state.db.dispose()
+
+
+application = Starlette(
+    routes=[
+        Route("/live", live_stream, methods=["GET"]),
+        Route("/messages/{message_id:int}/like", like_message, methods=["POST"]),
+        Route("/messages/{message_id:int}/unlike", unlike_message, methods=["POST"]),
+        Route("/guestbook/search", search_messages, methods=["GET"]),
+        Route("/guestbook/add", add_anon_message, methods=["POST"]),
+        # 나머지는 기존 Flask(WSGI) 앱을 스레드 풀에서
+        Mount("/", app=WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_WSGI_THREADS", "10")))),
+    ],
+    exception_handlers={RateLimited: on_rate_limited},
+    on_startup=[on_startup],
+    on_shutdown=[on_shutdown],
+)
@@ -0,0 +1,457 @@
+# bench.py
+"""
+라우트별 부하/지연 벤치마크.
+
+임시 SQLite DB와 임시 사진 폴더에 메시지 N개, 사진 M장을 시드한 뒤
+각 라우트를 지정한 동시성으로 두드리고 p50/p95/p99, 처리량, 요청당 DB 쿼리 수를 JSON으로 출력한다.
+쿼리 수는 test client 모드에서만 센다 (서버 모드에서는 쿼리가 다른 워커 프로세스에서 실행된다).
+
+    python bench.py                                   # Flask test client
+    python bench.py --messages 5000 --photos 50 -c 8 -n 400
+    python bench.py --gunicorn --workers 4            # 로컬 Gunicorn을 띄워 HTTP로 측정
+    python bench.py --uvicorn --workers 4             # ASGI 모드(asgi:application)를 Uvicorn으로
+    python bench.py --asgi-compare --workers 2 --sse-streams 200   # 같은 워커 수로 둘 다 + SSE 동시 연결 수
+    python bench.py --target http://127.0.0.1:5001    # 이미 떠 있는 서버 (시드/쿼리 수 제외)
+    python bench.py --out bench.json --baseline prev.json --max-regression 0.25   # CI 회귀 체크
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_PIN = "1234"
+BENCH_PASS = "bench-pass"
+
+ALL_ROUTES = ("index", "letter", "guestbook_add", "like", "unlike", "verify", "update", "delete", "media",
+              "search")
+
+
+# ====== 환경 준비 (app import 전에) ======
+def prepare_env(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["EDIT_PHOTOS_DIR"] = os.path.join(workdir, "photos_edit")
+    os.environ["CONTENT_VERSION_FILE"] = os.path.join(workdir, "content_version")
+    os.environ["LIKE_COUNTS_VERSION_FILE"] = os.path.join(workdir, "like_counts_version")
+    os.environ["PROFILE_DIR"] = os.path.join(workdir, "profiles")
+    os.environ["BIRTHDAY_PASS"] = BENCH_PASS
+    os.environ["PORTFOLIO_MODE"] = "false"
+    os.environ["SLACK_WEBHOOK_URL"] = ""
+    os.environ["RATE_LIMIT_ENABLED"] = "false"  # 한 IP에서 두드리므로 제한기는 끈다
+
+
+def seed(n_messages: int, n_photos: int):
+    """init_db.py와 같은 방식으로 테이블을 만들고 메시지/사진을 채운다. 메시지 id 목록을 반환."""
+    from sqlalchemy import insert
+
+    from app import app, db, hash_pin, EDIT_PHOTOS_DIR, SRC_PHOTOS_DIR, allowed
+    from models import Message
+
+    with app.app_context():
+        from init_db import create_tables
+        create_tables()
+        pin_hash = hash_pin(BENCH_PIN)  # KDF는 한 번만
+        now = datetime.now()
+        rows = [
+            {"nickname": f"bench{i}", "text": f"벤치마크 메시지 {i}", "pin_hash": pin_hash,
+             "like_count": 0, "created_at": now - timedelta(seconds=i)}
+            for i in range(n_messages)
+        ]
+        for i in range(0, len(rows), 1000):
+            db.session.execute(insert(Message), rows[i:i + 1000])
+        db.session.commit()
+        ids = [m for (m,) in db.session.query(Message.id).order_by(Message.id).all()]
+        from app import message_search
+        message_search.ensure_index()
+
+    os.makedirs(EDIT_PHOTOS_DIR, exist_ok=True)
+    samples = [os.path.join(SRC_PHOTOS_DIR, f) for f in sorted(os.listdir(SRC_PHOTOS_DIR)) if allowed(f)]
+    for i in range(n_photos):
+        src = samples[i % len(samples)]
+        shutil.copyfile(src, os.path.join(EDIT_PHOTOS_DIR, f"bench_{i:05d}{os.path.splitext(src)[1]}"))
+    return ids
+
+
+# ====== 클라이언트 ======
+class TestClientAdapter:
+    def __init__(self, app):
+        self.c = app.test_client()
+
+    def request(self, method, path, data=None, json_body=None, headers=None):
+        r = self.c.open(path, method=method, data=data, json=json_body, headers=headers or {})
+        r.close()
+        return r.status_code
+
+
+class HttpClient:
+    def __init__(self, base_url: str):
+        self.base = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect(),
+        )
+
+    def request(self, method, path, data=None, json_body=None, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode("utf-8")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        req = urllib.request.Request(self.base + path, data=body, method=method, headers=headers)
+        try:
+            with self.opener.open(req, timeout=30) as r:
+                r.read()
+                return r.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+# ====== 시나리오 ======
+JSON = {"Accept": "application/json"}
+
+
+def make_scenarios(ids, delete_pool, photo_names):
+    """라우트 이름 → fn(client, i) -> status. i는 워커 내 반복 번호."""
+    lock = threading.Lock()
+
+    def pick(i):
+        return ids[i % len(ids)] if ids else 0
+
+    def take_for_delete():
+        with lock:
+            return delete_pool.pop() if delete_pool else 0
+
+    return {
+        "index": lambda c, i: c.request("GET", "/"),
+        "letter": lambda c, i: c.request("GET", "/letter"),
+        "guestbook_add": lambda c, i: c.request(
+            "POST", "/guestbook/add", data={"nickname": "b", "text": f"add {i}", "pin": BENCH_PIN}, headers=JSON),
+        "like": lambda c, i: c.request("POST", f"/messages/{pick(i)}/like", json_body={}, headers=JSON),
+        "unlike": lambda c, i: c.request("POST", f"/messages/{pick(i)}/unlike", json_body={}, headers=JSON),
+        "verify": lambda c, i: c.request(
+            "POST", f"/guestbook/{pick(i)}/verify", json_body={"pin": BENCH_PIN}, headers=JSON),
+        "update": lambda c, i: c.request(
+            "POST", f"/guestbook/{pick(i)}/update", json_body={"pin": BENCH_PIN, "text": f"upd {i}"}, headers=JSON),
+        "delete": lambda c, i: c.request(
+            "POST", f"/guestbook/{take_for_delete()}/delete", json_body={"pin": BENCH_PIN}, headers=JSON),
+        "media": lambda c, i: c.request(
+            "GET", f"/media_example/photos/{photo_names[i % len(photo_names)]}" if photo_names else "/media_example/photos/none"),
+        "search": lambda c, i: c.request(
+            "GET", "/guestbook/search?" + urllib.parse.urlencode({"q": f"메시지 {i % 100}"}), headers=JSON),
+    }
+
+
+# ====== 측정 ======
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(p / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def run_route(name, fn, make_client, concurrency, n_requests, query_counter=None):
+    per_worker = max(1, n_requests // concurrency)
+    latencies, errors, statuses = [], 0, {}
+    lock = threading.Lock()
+    if query_counter:
+        query_counter.reset()
+
+    def worker(wid):
+        nonlocal errors
+        client = make_client(login=(name == "letter"))
+        local = []
+        local_err = 0
+        local_status = {}
+        for j in range(per_worker):
+            t0 = time.perf_counter()
+            try:
+                status = fn(client, wid * per_worker + j)
+            except Exception:
+                status = 0
+            local.append(time.perf_counter() - t0)
+            local_status[status] = local_status.get(status, 0) + 1
+            if not (200 <= status < 400):
+                local_err += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_err
+            for k, v in local_status.items():
+                statuses[k] = statuses.get(k, 0) + v
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    total = len(latencies)
+    result = {
+        "requests": total,
+        "errors": errors,
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / total) if total else None,
+        "throughput_rps": round(total / wall, 1) if wall else None,
+    }
+    if query_counter and total:
+        result["db_queries_per_request"] = round(query_counter.count / total, 2)
+    return result
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+
+def compare_baseline(report, baseline_path, max_regression):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)
+    failures = []
+    for route, cur in report["routes"].items():
+        prev = base.get("routes", {}).get(route)
+        if not prev or not prev.get("p95_ms") or cur.get("p95_ms") is None:
+            continue
+        ratio = cur["p95_ms"] / prev["p95_ms"] - 1
+        if ratio > max_regression:
+            failures.append(f"{route}: p95 {prev['p95_ms']}ms → {cur['p95_ms']}ms (+{ratio:.0%})")
+    return failures
+
+
+def _wait_http(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+SERVERS = {
+    # 이름 → (모듈, 인자들)  같은 워커 수로 WSGI / ASGI 배포를 나란히 비교
+    "gunicorn": ("gunicorn", lambda w, port: ["-w", str(w), "-b", f"127.0.0.1:{port}", "app:app"]),
+    "uvicorn": ("uvicorn", lambda w, port: ["--workers", str(w), "--host", "127.0.0.1", "--port", str(port),
+                                            "--log-level", "warning", "asgi:application"]),
+}
+
+
+def start_server(kind: str, workers: int, port: int, env: dict | None = None):
+    module, make_args = SERVERS[kind]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", module, *make_args(workers, port)],
+        cwd=BASE_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    if not _wait_http(base_url + "/login"):
+        proc.terminate()
+        raise SystemExit(f"{kind} did not start")
+    return proc, base_url
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()  # 열린 SSE 스트림 때문에 graceful 종료가 늦을 수 있음
+
+
+def sse_probe(base_url: str, n_streams: int, timeout: float = 10.0) -> dict:
+    """
+    /live 스트림을 n개 동시에 열어 timeout 안에 첫 바이트(retry:)를 받은 수와 TTFB를 잰다.
+    Gunicorn은 기본 설정에서 /live가 꺼져 있으므로(503) 측정할 때만 LIVE_SYNC_STREAM=true로 띄운다.
+    gthread 워커는 스트림 하나가 스레드 하나를 잡으므로 열린 수 ≈ 워커 × 스레드(GUNICORN_THREADS)에서 멈춘다.
+    """
+    u = urllib.parse.urlsplit(base_url)
+    lock = threading.Lock()
+    socks, ttfb = [], []
+    request = f"GET /live HTTP/1.1\r\nHost: {u.netloc}\r\nAccept: text/event-stream\r\n\r\n".encode()
+
+    def open_one():
+        start = time.perf_counter()
+        s = None
+        try:
+            s = socket.create_connection((u.hostname, u.port or 80), timeout=timeout)
+            s.sendall(request)
+            buf = b""
+            while b"retry:" not in buf:
+                chunk = s.recv(4096)
+                if not chunk:
+                    raise ConnectionError("closed")
+                buf += chunk
+        except OSError:
+            if s is not None:
+                s.close()
+            return
+        with lock:
+            socks.append(s)
+            ttfb.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=open_one, daemon=True) for _ in range(n_streams)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout + 5)
+    for s in socks:
+        s.close()
+    ttfb.sort()
+    return {
+        "requested": n_streams,
+        "opened": len(ttfb),
+        "ttfb_ms": {
+            "p50": round(percentile(ttfb, 50) * 1000, 2),
+            "p95": round(percentile(ttfb, 95) * 1000, 2),
+        } if ttfb else None,
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="HBD 라우트 벤치마크")
+    p.add_argument("--messages", type=int, default=1000)
+    p.add_argument("--photos", type=int, default=20)
+    p.add_argument("-c", "--concurrency", type=int, default=4)
+    p.add_argument("-n", "--requests", type=int, default=200, help="라우트당 요청 수")
+    p.add_argument("--routes", default=",".join(ALL_ROUTES))
+    servers = p.add_mutually_exclusive_group()
+    servers.add_argument("--gunicorn", action="store_true", help="로컬 Gunicorn을 띄워 HTTP로 측정")
+    servers.add_argument("--uvicorn", action="store_true", help="ASGI 모드(asgi:application)를 Uvicorn으로 측정")
+    servers.add_argument("--asgi-compare", action="store_true", help="Gunicorn과 Uvicorn을 같은 워커 수로 차례로 측정")
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--sse-streams", type=int, default=0, help="서버 모드에서 /live 동시 연결 수 측정 (0이면 생략)")
+    p.add_argument("--target", default="", help="이미 실행 중인 서버 URL (시드 생략)")
+    p.add_argument("--out", default="")
+    p.add_argument("--baseline", default="")
+    p.add_argument("--max-regression", type=float, default=0.25)
+    args = p.parse_args(argv)
+
+    routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    unknown = set(routes) - set(ALL_ROUTES)
+    if unknown:
+        p.error(f"unknown routes: {', '.join(sorted(unknown))}")
+    if args.asgi_compare and "delete" in routes:
+        # 두 서버가 같은 DB를 쓰므로 삭제 풀이 한 번만 유효하다
+        routes.remove("delete")
+
+    workdir = tempfile.mkdtemp(prefix="hbd-bench-")
+    try:
+        ids, photo_names, query_counter = [], [], None
+        if args.target:
+            targets = [("http", args.target)]
+        else:
+            prepare_env(workdir)
+            ids = seed(args.messages, args.photos)
+            from app import app, db, EDIT_PHOTOS_DIR
+            photo_names = sorted(f for f in os.listdir(EDIT_PHOTOS_DIR) if f.startswith("bench_"))
+            if args.asgi_compare:
+                targets = [("gunicorn", None), ("uvicorn", None)]
+            elif args.gunicorn or args.uvicorn:
+                targets = [("gunicorn" if args.gunicorn else "uvicorn", None)]
+            else:
+                from sqlalchemy import event
+                targets = [("test_client", "")]
+                query_counter = QueryCounter()
+                with app.app_context():
+                    event.listen(db.engine, "before_cursor_execute", query_counter)
+
+        # 삭제는 라우트 요청 수만큼 메시지를 소모하므로 목록 뒤쪽을 따로 떼어 둔다
+        delete_pool = ids[-args.requests:] if "delete" in routes else []
+        ids = ids[:len(ids) - len(delete_pool)] or ids
+
+        reports = {}
+        for mode, base_url in targets:
+            server = None
+            if mode in SERVERS:
+                # WSGI 쪽 /live는 기본으로 꺼져 있다 → SSE를 잴 때만 동기 스트림을 켜서 비교가 되게
+                env = {"LIVE_SYNC_STREAM": "true"} if mode == "gunicorn" and args.sse_streams else None
+                server, base_url = start_server(mode, args.workers, args.port, env)
+            try:
+                def make_client(login=False, mode=mode, base_url=base_url):
+                    if mode == "test_client":
+                        from app import app
+                        c = TestClientAdapter(app)
+                    else:
+                        c = HttpClient(base_url)
+                    if login:
+                        c.request("POST", "/login", data={"password": BENCH_PASS})
+                    return c
+
+                scenarios = make_scenarios(ids, delete_pool, photo_names)
+                report = {
+                    "mode": mode,
+                    "messages": args.messages,
+                    "photos": args.photos,
+                    "concurrency": args.concurrency,
+                    "requests_per_route": args.requests,
+                    "routes": {},
+                }
+                if mode in SERVERS:
+                    report["workers"] = args.workers
+                if query_counter is None:
+                    report["db_queries_per_request"] = "test_client only"
+                for name in routes:
+                    report["routes"][name] = run_route(
+                        name, scenarios[name], make_client, args.concurrency, args.requests, query_counter)
+                if args.sse_streams and mode != "test_client":
+                    report["sse"] = sse_probe(base_url, args.sse_streams)
+            finally:
+                if server is not None:
+                    stop_server(server)
+            reports[mode] = report
+
+        report = reports if len(reports) > 1 else next(iter(reports.values()))
+        out = json.dumps(report, ensure_ascii=False, indent=2)
+        print(out)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(out + "\n")
+        if args.baseline and len(reports) == 1:
+            failures = compare_baseline(report, args.baseline, args.max_regression)
+            if failures:
+                print("❌ p95 regression:\n  " + "\n  ".join(failures), file=sys.stderr)
+                return 1
+        return 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
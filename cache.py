@@ -0,0 +1,313 @@
+# cache.py
+"""
+2단 캐시: 프로세스 메모리(LRU + TTL, 바이트 상한) + 선택적 공유 저장소.
+
+- LocalCache: 워커 프로세스 하나에 하나. 모든 네임스페이스가 같은 상한(CACHE_LOCAL_MAX_BYTES)을
+  나눠 쓰므로 캐시 종류가 늘어도 프로세스 메모리는 그 이상 커지지 않는다.
+- 공유 저장소(CACHE_URL): 한 워커가 계산한 값을 다른 워커가 그대로 쓴다.
+    redis://localhost:6379/0   Redis 호환 서버 (상한은 서버의 maxmemory + allkeys-lru)
+    sqlite:///var/cache/hbd.db 단일 호스트용 파일 캐시 (WAL + mmap, CACHE_SHARED_MAX_BYTES로 상한)
+  비어 있으면 로컬 단만 쓴다. 공유 저장소 오류는 미스로 취급한다(캐시가 요청을 실패시키지 않음).
+
+값은 pickle로 직렬화해 공유 저장소에 넣는다 — 앱 자신만 쓰는 저장소여야 한다.
+"""
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+_MISSING = object()
+
+
+# ====== 프로세스 메모리 단 ======
+class LocalCache:
+    """바이트 상한 LRU. 항목마다 만료 시각(없으면 None)을 둔다."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: (expires_at, size, value)}
+        self.size = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return default
+            expires_at, _size, value = hit
+            if expires_at is not None and expires_at < time.monotonic():
+                self._pop(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None, size: int | None = None):
+        size = _sizeof(value) if size is None else size
+        if size > self.max_bytes:
+            return  # 상한보다 큰 값은 보관하지 않는다
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (expires_at, size, value)
+            self.size += size
+            while self.size > self.max_bytes:
+                old, _ = next(iter(self._entries.items()))
+                self._pop(old)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop(self, key):
+        hit = self._entries.pop(key, None)
+        if hit is not None:
+            self.size -= hit[1]
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) + 64
+
+
+# ====== 공유 단 ======
+class RedisCache:
+    """Redis 호환 서버 (redis 패키지 필요). 연결은 프로세스마다 따로 (fork 후 재사용 금지)."""
+
+    def __init__(self, url: str, prefix: str = "hbd:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL=redis://... 에는 redis 패키지가 필요합니다 (pip install redis)") from e
+        self._redis = redis
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._pid = None
+
+    @property
+    def client(self):
+        if self._pid != os.getpid():
+            self._client = self._redis.Redis.from_url(self.url, socket_timeout=0.2, socket_connect_timeout=0.2)
+            self._pid = os.getpid()
+        return self._client
+
+    def get(self, key: str):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, data: bytes, ttl: float | None = None):
+        self.client.set(self.prefix + key, data, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+class SQLiteCache:
+    """
+    단일 호스트 공유 캐시 파일. 워커들이 같은 파일을 WAL 모드로 열고 읽기는 mmap으로 한다.
+    전체 크기가 max_bytes를 넘으면 오래 쓰인 순(written_at)으로 지운다.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._total = None  # 대략적인 현재 크기 (프로세스마다 추정, 넘친 것 같으면 DB에서 다시 셈)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL, written_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_written_at ON cache (written_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # 캐시라서 유실돼도 다시 계산하면 된다
+            conn.execute(f"PRAGMA mmap_size={self.max_bytes}")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def set(self, key: str, data: bytes, ttl: float | None = None):
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, expires_at, written_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now + ttl if ttl else None, now),
+        )
+        with self._lock:
+            if self._total is None:
+                self._total = conn.execute("SELECT coalesce(sum(size), 0) FROM cache").fetchone()[0]
+            else:
+                self._total += len(data)
+            over = self._total > self.max_bytes
+        if over:
+            self._evict(conn, now)
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        total = conn.execute("SELECT coalesce(sum(size), 0) FROM cache").fetchone()[0]
+        target = self.max_bytes * 0.8  # 한 번에 여유를 만들어 매 set마다 정리하지 않게
+        if total > target:
+            freed = 0
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM cache ORDER BY written_at"):
+                if total - freed <= target:
+                    break
+                doomed.append((key,))
+                freed += size
+            conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+            total -= freed
+        with self._lock:
+            self._total = total
+
+
+def shared_backend_from_url(url: str, max_bytes: int):
+    """CACHE_URL → 공유 저장소 (비어 있으면 None)"""
+    if not url:
+        return None
+    scheme = urlsplit(url).scheme
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisCache(url)
+    if scheme == "sqlite":
+        return SQLiteCache(url[len("sqlite:///"):], max_bytes=max_bytes)
+    raise ValueError(f"unknown CACHE_URL scheme: {scheme}")
+
+
+# ====== 2단 캐시 ======
+class TieredCache:
+    """로컬 단 → 공유 단 순서로 찾고, 공유 단에서 찾은 값은 로컬 단에도 채운다."""
+
+    def __init__(self, local: LocalCache, shared=None):
+        self.local = local
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.stats = {}  # {namespace: [local hits, shared hits, misses, shared errors]}
+
+    def namespace(self, name: str, ttl: float | None = None, shared: bool = True) -> "CacheNamespace":
+        with self._lock:
+            self.stats.setdefault(name, [0, 0, 0, 0])
+        return CacheNamespace(self, name, ttl, shared and self.shared is not None)
+
+    def _count(self, name: str, i: int):
+        with self._lock:
+            self.stats[name][i] += 1
+
+
+class CacheNamespace:
+    """캐시 한 종류 (키 앞에 이름이 붙는다). 키는 문자열."""
+
+    def __init__(self, tiers: TieredCache, name: str, ttl: float | None, shared: bool):
+        self.tiers = tiers
+        self.name = name
+        self.ttl = ttl
+        self.shared = shared
+
+    def get(self, key: str, default=None):
+        full = f"{self.name}:{key}"
+        value = self.tiers.local.get(full, _MISSING)
+        if value is not _MISSING:
+            self.tiers._count(self.name, 0)
+            return value
+        if self.shared:
+            try:
+                data = self.tiers.shared.get(full)
+            except Exception as e:
+                print("⚠️ shared cache get error:", e)
+                self.tiers._count(self.name, 3)
+                data = None
+            if data is not None:
+                value = pickle.loads(data)
+                # 남은 TTL은 모르므로 로컬 단에는 이 네임스페이스의 TTL만큼만
+                self.tiers.local.set(full, value, self.ttl)
+                self.tiers._count(self.name, 1)
+                return value
+        self.tiers._count(self.name, 2)
+        return default
+
+    def set(self, key: str, value, ttl: float | None = None):
+        full = f"{self.name}:{key}"
+        ttl = self.ttl if ttl is None else ttl
+        if self.shared:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self.tiers.local.set(full, value, ttl, size=len(data) + 64)
+            try:
+                self.tiers.shared.set(full, data, ttl)
+            except Exception as e:
+                print("⚠️ shared cache set error:", e)
+                self.tiers._count(self.name, 3)
+        else:
+            self.tiers.local.set(full, value, ttl)
+
+    def delete(self, key: str):
+        full = f"{self.name}:{key}"
+        self.tiers.local.delete(full)
+        if self.shared:
+            try:
+                self.tiers.shared.delete(full)
+            except Exception as e:
+                print("⚠️ shared cache delete error:", e)
+
+
+def cache_metrics_lines(tiers: TieredCache) -> list[str]:
+    """Prometheus 텍스트 줄들 (워커 프로세스별)"""
+    with tiers._lock:
+        stats = {k: list(v) for k, v in tiers.stats.items()}
+    out = [
+        "# HELP hbd_cache_requests_total Cache lookups by namespace and result.",
+        "# TYPE hbd_cache_requests_total counter",
+    ]
+    for name, (local_hits, shared_hits, misses, _errors) in sorted(stats.items()):
+        out.append(f'hbd_cache_requests_total{{cache="{name}",result="local_hit"}} {local_hits}')
+        out.append(f'hbd_cache_requests_total{{cache="{name}",result="shared_hit"}} {shared_hits}')
+        out.append(f'hbd_cache_requests_total{{cache="{name}",result="miss"}} {misses}')
+    out += [
+        "# HELP hbd_cache_shared_errors_total Shared cache tier errors (treated as misses).",
+        "# TYPE hbd_cache_shared_errors_total counter",
+    ]
+    for name, counts in sorted(stats.items()):
+        out.append(f'hbd_cache_shared_errors_total{{cache="{name}"}} {counts[3]}')
+    out += [
+        "# HELP hbd_cache_local_bytes Bytes held by the in-process cache tier.",
+        "# TYPE hbd_cache_local_bytes gauge",
+        f"hbd_cache_local_bytes {tiers.local.size}",
+        "# HELP hbd_cache_local_max_bytes Hard cap of the in-process cache tier.",
+        "# TYPE hbd_cache_local_max_bytes gauge",
+        f"hbd_cache_local_max_bytes {tiers.local.max_bytes}",
+        "# HELP hbd_cache_local_evictions_total Entries evicted to stay under the cap.",
+        "# TYPE hbd_cache_local_evictions_total counter",
+        f"hbd_cache_local_evictions_total {tiers.local.evictions}",
+    ]
+    return out
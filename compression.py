@@ -0,0 +1,126 @@
+# compression.py
+"""
+응답 압축 (gzip / brotli).
+
+- 동적: 렌더된 HTML, json_or_redirect 등의 JSON 응답을 after_request에서 바로 압축한다.
+  스트리밍 응답(SSE)과 send_file 응답(direct_passthrough), 이미 Content-Encoding이 붙은 응답
+  (메인 페이지처럼 압축본을 캐시해 둔 뷰)은 건드리지 않는다.
+- 정적: 빌드 때(static_manifest.py) 텍스트 자산 옆에 .gz / .br 사본을 미리 만들어 두고,
+  정적 라우트가 클라이언트의 Accept-Encoding에 맞는 사본을 Content-Encoding과 함께 보낸다.
+
+brotli 패키지가 없으면 gzip만 쓴다.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+    "application/json", "image/svg+xml", "application/xml", "text/xml",
+}
+PRECOMPRESS_EXTS = {".css", ".js", ".mjs", ".svg", ".html", ".json", ".txt", ".map", ".xml", ".ico"}
+# 서버 선호 순서 (같은 q 값이면 앞쪽)
+ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str, available=None) -> str | None:
+    """Accept-Encoding(q 값 포함)과 available 중 가장 적합한 인코딩. 없으면 None."""
+    available = supported_encodings() if available is None else available
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    best, best_q = None, 0.0
+    for enc in ENCODING_SUFFIX:
+        if enc not in available:
+            continue
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress_bytes(data: bytes, encoding: str, build: bool = False) -> bytes:
+    """build=True면 빌드 시점용 최고 압축률, 아니면 요청 처리용 빠른 설정."""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if build else 4)
+    return gzip.compress(data, compresslevel=9 if build else 6, mtime=0)
+
+
+def precompress_file(path: str) -> list[str]:
+    """path 옆에 .gz/.br 사본을 만든다(원본보다 작을 때만). 만든 인코딩 목록 반환."""
+    with open(path, "rb") as f:
+        data = f.read()
+    made = []
+    for enc in supported_encodings():
+        out = path + ENCODING_SUFFIX[enc]
+        packed = compress_bytes(data, enc, build=True)
+        if len(packed) >= len(data):
+            if os.path.exists(out):
+                os.remove(out)
+            continue
+        tmp = out + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, out)
+        made.append(enc)
+    return made
+
+
+class Compression:
+    def __init__(self, app=None, min_size: int = 500):
+        self.min_size = min_size
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        app.extensions["compression"] = self
+
+    def pick_encoding(self, size: int) -> str | None:
+        """이 요청에 쓸 인코딩. 압축하지 않을 응답(작거나 HEAD)이면 None."""
+        from flask import request
+
+        if size < self.min_size or request.method == "HEAD":
+            return None
+        return negotiate(request.headers.get("Accept-Encoding", ""))
+
+    def compress_response(self, response):
+        from flask import request
+
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or request.method == "HEAD"
+        ):
+            return response
+        data = response.get_data()
+        enc = self.pick_encoding(len(data))
+        if enc is None:
+            return response
+        response.set_data(compress_bytes(data, enc))
+        response.headers["Content-Encoding"] = enc
+        return response
@@ -0,0 +1,150 @@
+# db_routing.py
+"""
+읽기/쓰기 DB 라우팅 + 커넥션 풀 지표.
+
+- DATABASE_REPLICA_URL 이 있으면 SQLALCHEMY_BINDS["replica"] 로 두 번째 엔진을 만든다.
+  @read_only 가 붙은 조회 뷰(index, letter, 목록, 검색)의 세션 쿼리는 replica로,
+  그 밖의 모든 것(쓰기, 좋아요 엔진, 장부)은 primary로 간다.
+- 복제 지연 대비: 최근 REPLICA_MAX_LAG_SECONDS 안에 쓰기가 있었으면(콘텐츠/좋아요 버전 기준)
+  읽기도 primary에서 한다. 방금 쓴 사람이 자기 글을 못 보거나 낡은 페이지가 캐시되는 일을 막는다.
+- TimedQueuePool: 커넥션을 받기까지 기다린 시간, 풀이 가득 찬 상태에서의 checkout 수,
+  타임아웃 수를 엔진별로 모아 /metrics 로 내보낸다 (풀 크기를 데이터로 정하기 위함).
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import QueuePool
+
+REPLICA_BIND = "replica"
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+# ---------- 라우팅 ----------
+def read_only(view):
+    """조회 전용 뷰 표시: 조건이 맞으면 이 요청의 세션 읽기를 replica로 보낸다."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # 복제 지연 판단은 요청당 한 번만
+        g.db_read_only = RoutingSession.replica_allowed()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    # 앱이 설정: () -> bool. 복제 지연 유예 등 replica를 써도 되는지 판단
+    replica_allowed = staticmethod(lambda: True)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and has_request_context()
+            and g.get("db_read_only")
+            and not self._flushing
+            and not self.new
+            and not self.deleted
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+# ---------- 풀 지표 ----------
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * len(WAIT_BUCKETS)
+        self.full_checkouts = 0  # checkout 직후 풀이 가득 찬 상태였던 횟수 (포화)
+        self.overflow_checkouts = 0  # pool_size를 넘어 overflow 연결을 쓴 횟수
+        self.timeouts = 0
+
+    def record(self, wait: float, in_use: int, size: int, capacity: int | None):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_sum += wait
+            self.wait_max = max(self.wait_max, wait)
+            for i, le in enumerate(WAIT_BUCKETS):
+                if wait <= le:
+                    self.buckets[i] += 1
+            if in_use > size:
+                self.overflow_checkouts += 1
+            if capacity is not None and in_use >= capacity:
+                self.full_checkouts += 1
+
+    def record_timeout(self, wait: float):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_sum += wait
+            self.wait_max = max(self.wait_max, wait)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool + checkout 대기 시간/포화 카운터"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+        capacity = None if self._max_overflow < 0 else self.size() + self._max_overflow
+        self.stats.record(time.perf_counter() - start, self.checkedout(), self.size(), capacity)
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.stats = self.stats  # dispose 후에도 누적 지표 유지
+        return new
+
+
+def pool_metrics_lines(engines: dict) -> list[str]:
+    """{bind 이름: engine} → Prometheus 텍스트 줄들"""
+    pools = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        if isinstance(pool, TimedQueuePool):
+            pools[name or "primary"] = pool
+    if not pools:
+        return []
+
+    out = [
+        "# HELP hbd_db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+        "# TYPE hbd_db_pool_checkout_wait_seconds histogram",
+    ]
+    for name, pool in sorted(pools.items()):
+        st = pool.stats
+        with st._lock:
+            buckets, count, wait_sum = list(st.buckets), st.checkouts, st.wait_sum
+        for le, n in zip(WAIT_BUCKETS, buckets):
+            out.append(f'hbd_db_pool_checkout_wait_seconds_bucket{{bind="{name}",le="{le}"}} {n}')
+        out.append(f'hbd_db_pool_checkout_wait_seconds_bucket{{bind="{name}",le="+Inf"}} {count}')
+        out.append(f'hbd_db_pool_checkout_wait_seconds_sum{{bind="{name}"}} {wait_sum:.6f}')
+        out.append(f'hbd_db_pool_checkout_wait_seconds_count{{bind="{name}"}} {count}')
+
+    series = (
+        ("hbd_db_pool_checkout_wait_seconds_max", "gauge", "Longest checkout wait seen.", lambda p: f"{p.stats.wait_max:.6f}"),
+        ("hbd_db_pool_saturated_checkouts_total", "counter", "Checkouts that left the pool at full capacity.", lambda p: p.stats.full_checkouts),
+        ("hbd_db_pool_overflow_checkouts_total", "counter", "Checkouts served by overflow connections.", lambda p: p.stats.overflow_checkouts),
+        ("hbd_db_pool_timeouts_total", "counter", "Checkouts that gave up after pool_timeout.", lambda p: p.stats.timeouts),
+        ("hbd_db_pool_checked_out", "gauge", "Connections currently checked out.", lambda p: p.checkedout()),
+        ("hbd_db_pool_size", "gauge", "Configured pool_size.", lambda p: p.size()),
+        ("hbd_db_pool_max_overflow", "gauge", "Configured max_overflow.", lambda p: p._max_overflow),
+    )
+    for metric, kind, help_text, value in series:
+        out.append(f"# HELP {metric} {help_text}")
+        out.append(f"# TYPE {metric} {kind}")
+        for name, pool in sorted(pools.items()):
+            out.append(f'{metric}{{bind="{name}"}} {value(pool)}')
+    return out
@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+"""
+Gunicorn 설정:  gunicorn -c gunicorn.conf.py
+
+preload_app: 마스터가 app을 한 번 import하고 create_app()으로 준비(사진 시드, 템플릿 컴파일,
+정적 해시, 사진 목록)를 끝낸 뒤 fork한다. 워커는 그 결과를 copy-on-write로 물려받아
+첫 요청이 준비 작업을 기다리지 않는다. DB 커넥션은 fork 전에 닫고 자식에서 풀을 새로 만든다.
+
+gthread 워커: keep-alive로 쉬고 있는 연결은 스레드가 아니라 워커의 selector가 들고 있고,
+하트비트를 메인 스레드가 보내므로 긴 요청 때문에 arbiter가 워커를 죽이지 않는다.
+실시간 피드(/live)는 이 배포에서는 켜지 않는다(LIVE_SYNC_STREAM 기본값 false → 즉시 503).
+스트림이 필요하면 ASGI 진입점(uvicorn asgi:application)으로 배포한다.
+"""
+import os
+
+wsgi_app = "app:create_app()"
+preload_app = True
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5001")
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+def when_ready(server):
+    from app import STARTUP_SECONDS
+    total = STARTUP_SECONDS.get("import", 0.0) + STARTUP_SECONDS.get("warm", 0.0)
+    server.log.info("app preloaded in %.0fms, forking %d workers", total * 1000, server.num_workers)
+
+
+def post_fork(server, worker):
+    # register_at_fork 훅과 같은 일 — 다른 preload 설정에서도 확실히 하기 위해 한 번 더
+    from app import dispose_db_engines
+    dispose_db_engines(close=False)
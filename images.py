@@ -0,0 +1,97 @@
+# images.py
+"""
+사진 파생본(리사이즈 WebP/JPEG) 파이프라인.
+
+원본 옆 `.derived/` 폴더에 `{원본파일명}.{width}.webp` / `.jpg` 를 만들어 두고,
+사진 목록 헬퍼가 srcset을 만들어 브라우저가 화면에 맞는 가장 작은 파일을 고르게 한다.
+Pillow가 없으면 파생본 없이 원본만 서빙한다(기존 동작).
+"""
+import importlib.util
+import os
+
+# Pillow는 실제로 리사이즈할 때만 import한다 (워커 콜드 스타트에서 import 비용을 뺀다)
+HAS_PIL = importlib.util.find_spec("PIL") is not None
+
+DERIVED_DIRNAME = ".derived"
+DERIVATIVE_WIDTHS = (480, 960, 1440)  # Swiper 프레임(최대 420px 높이) 기준 1x~3x
+WEBP_QUALITY = 78
+JPEG_QUALITY = 82
+# 애니메이션 GIF는 첫 프레임만 남으므로 파생본을 만들지 않는다
+RESIZABLE_EXT = {"jpg", "jpeg", "png", "webp"}
+
+
+def derived_dir(src_dir: str) -> str:
+    return os.path.join(src_dir, DERIVED_DIRNAME)
+
+
+def _is_resizable(filename: str) -> bool:
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in RESIZABLE_EXT
+
+
+def build_derivatives(src_dir: str, filename: str) -> list[int]:
+    """
+    src_dir/filename 의 파생본을 만든다(원본보다 최신이면 건너뜀).
+    만들어진(또는 이미 있는) 너비 목록을 반환한다.
+    """
+    if not HAS_PIL or not _is_resizable(filename):
+        return []
+    from PIL import Image, ImageOps
+    src = os.path.join(src_dir, filename)
+    out_dir = derived_dir(src_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    src_mtime = os.path.getmtime(src)
+
+    widths = []
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        for w in DERIVATIVE_WIDTHS:
+            if w >= im.width:
+                break
+            widths.append(w)
+            webp_path = os.path.join(out_dir, f"{filename}.{w}.webp")
+            jpg_path = os.path.join(out_dir, f"{filename}.{w}.jpg")
+            if all(os.path.exists(p) and os.path.getmtime(p) >= src_mtime for p in (webp_path, jpg_path)):
+                continue
+            h = round(im.height * w / im.width)
+            resized = im.resize((w, h), Image.LANCZOS)
+            resized.save(webp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+            if resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+            resized.save(jpg_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return widths
+
+
+def build_dir_derivatives(src_dir: str, allowed) -> int:
+    """폴더의 모든 사진에 대해 파생본을 보장한다. 처리한 파일 수를 반환."""
+    if not HAS_PIL or not os.path.isdir(src_dir):
+        return 0
+    count = 0
+    for f in sorted(os.listdir(src_dir)):
+        if not allowed(f):
+            continue
+        try:
+            build_derivatives(src_dir, f)
+            count += 1
+        except Exception as e:
+            print(f"⚠️ derivative build error ({f}):", e)
+    return count
+
+
+def remove_derivatives(src_dir: str, filename: str):
+    out_dir = derived_dir(src_dir)
+    for w in DERIVATIVE_WIDTHS:
+        for ext in ("webp", "jpg"):
+            try:
+                os.remove(os.path.join(out_dir, f"{filename}.{w}.{ext}"))
+            except FileNotFoundError:
+                pass
+
+
+def srcset_entries(filename: str, derived_names: set[str]) -> list[tuple[int, str, str]]:
+    """[(width, webp_name, jpg_name)] — 두 포맷이 모두 있는 너비만."""
+    entries = []
+    for w in DERIVATIVE_WIDTHS:
+        webp, jpg = f"{filename}.{w}.webp", f"{filename}.{w}.jpg"
+        if webp in derived_names and jpg in derived_names:
+            entries.append((w, webp, jpg))
+    return entries
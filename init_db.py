@@ -1,9 +1,14 @@
+import argparse
 import os
+import random
+import sys
 import time
 from urllib.parse import parse_qs, urlparse
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
-from app import app, db
+from app import app, db, build_all_photo_derivatives, content_version, message_search
+from archive import ARCHIVE_TABLES, export_jsonl, import_jsonl
+from static_manifest import build_manifest
 
 try:
     from models import *
@@ -103,28 +108,33 @@ def _get_target_schema() -> str | None:
     db_url = app.config.get("SQLALCHEMY_DATABASE_URI", "")
     return _extract_search_path_from_url(db_url) or _extract_search_path_from_engine_options()
 
-def wait_for_db(max_wait=60, interval=2):
-    """Postgres일 때 DB가 준비될 때까지 ping."""
+def wait_for_db(max_wait=60, initial_interval=0.1, max_interval=5.0):
+    """Postgres일 때 DB가 준비될 때까지 ping. 간격은 지수적으로 늘린다(0.1s → 최대 5s, 지터 포함)."""
     uri = app.config.get("SQLALCHEMY_DATABASE_URI")
     print(f"🔌 DB URI = {uri}")
     if not IS_POSTGRES:
         print("ℹ️ SQLite/기타 드라이버: 연결 대기 생략")
         return
 
-    elapsed = 0
+    start = time.monotonic()
+    interval = initial_interval
+    attempt = 0
     while True:
+        attempt += 1
         try:
             with db.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
-            print("✅ DB connection OK")
+            print(f"✅ DB connection OK ({time.monotonic() - start:.1f}s, {attempt} tries)")
             return
         except OperationalError as e:
-            elapsed += interval
+            elapsed = time.monotonic() - start
             if elapsed >= max_wait:
                 print("❌ DB not ready within timeout:", repr(e))
                 raise
-            print(f"⏳ Waiting for DB... ({elapsed}/{max_wait}s)")
-            time.sleep(interval)
+            sleep = min(interval * random.uniform(0.5, 1.0), max_wait - elapsed)
+            print(f"⏳ Waiting for DB... ({elapsed:.1f}/{max_wait}s, retry in {sleep:.2f}s)")
+            time.sleep(sleep)
+            interval = min(interval * 2, max_interval)
 
 def ensure_schema_if_needed():
     """
@@ -181,11 +191,73 @@ def seed_dummy_if_portfolio():
         db.session.commit()
         print("🌱 Seeded demo data (PORTFOLIO_MODE)")
 
+def ensure_search_index():
+    """방명록 검색 인덱스(SQLite FTS5 / Postgres tsvector+GIN) 생성 및 기존 메시지 색인"""
+    if message_search.ensure_index():
+        print("🔎 search index ensured")
+
+def build_photo_derivatives():
+    """사진 리사이즈 파생본(WebP/JPEG) 미리 생성 — 요청 시점에 원본을 보내지 않도록"""
+    n = build_all_photo_derivatives()
+    print(f"🖼  photo derivatives ensured ({n} files)")
+
+def build_static_manifest():
+    """정적 파일 해시 매니페스트 생성 (static_v가 요청 시 파일을 읽지 않도록)"""
+    m = build_manifest()
+    print(f"🧾 static manifest built ({len(m['files'])} files)")
+
+def export_archive(path: str, tables=None):
+    """방명록/생일 메시지/편지를 JSONL로 스트리밍 내보내기"""
+    t0 = time.perf_counter()
+    counts = export_jsonl(path, tables)
+    # 상태 줄은 stderr로: path가 '-'면 stdout은 JSONL 데이터 그 자체다
+    print(f"📦 exported {counts} → {path} ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+
+def import_archive(path: str, batch_size: int, replace: bool, renumber: bool):
+    """JSONL 아카이브를 배치 INSERT로 가져오기 (검색 인덱스/페이지 캐시도 갱신)"""
+    t0 = time.perf_counter()
+    counts = import_jsonl(path, batch_size=batch_size, replace=replace, renumber=renumber)
+    print(f"📥 imported {counts} ← {path} ({time.perf_counter() - t0:.1f}s)")
+    # 행 수가 같아도 내용이 바뀌었을 수 있으니 검색 인덱스는 통째로 다시 채운다
+    if message_search.ensure_index():
+        message_search.rebuild()
+        db.session.commit()
+    content_version.bump()
+
+def init_all():
+    wait_for_db()
+    ensure_schema_if_needed()
+    create_tables()
+    reset_sqlite_if_legacy_schema()
+    seed_dummy_if_portfolio()
+    ensure_search_index()
+    build_photo_derivatives()
+    build_static_manifest()
+    print("✅ init_db done.")
+
+def _parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="DB 초기화 / 방명록 아카이브")
+    sub = ap.add_subparsers(dest="command")
+    sub.add_parser("init", help="테이블/인덱스/파생본/매니페스트 준비 (기본)")
+    ex = sub.add_parser("export", help="JSONL로 내보내기")
+    ex.add_argument("path", help="출력 파일 ('-'면 표준출력)")
+    ex.add_argument("--tables", nargs="+", choices=sorted(ARCHIVE_TABLES), default=None)
+    im = sub.add_parser("import", help="JSONL 가져오기")
+    im.add_argument("path")
+    im.add_argument("--batch-size", type=int, default=5000)
+    im.add_argument("--replace", action="store_true", help="파일에 있는 테이블을 먼저 비움")
+    im.add_argument("--renumber", action="store_true", help="id를 버리고 새로 매김 (기존 데이터에 덧붙이기)")
+    return ap.parse_args(argv)
+
 if __name__ == "__main__":
+    args = _parse_args()
     with app.app_context():
-        wait_for_db()
-        ensure_schema_if_needed()
-        create_tables()
-        reset_sqlite_if_legacy_schema()
-        seed_dummy_if_portfolio()
-        print("✅ init_db done.")
\ No newline at end of file
+        if args.command == "export":
+            export_archive(args.path, args.tables)
+        elif args.command == "import":
+            wait_for_db()
+            ensure_schema_if_needed()
+            create_tables()
+            import_archive(args.path, args.batch_size, args.replace, args.renumber)
+        else:
+            init_all()
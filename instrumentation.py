@@ -0,0 +1,320 @@
+# instrumentation.py
+"""
+요청 단위 계측 (INSTRUMENTATION=true 일 때만 켜짐).
+
+app.wsgi_app을 감싸 엔드포인트별로
+  - 전체 처리 시간(wall)
+  - SQLAlchemy 쿼리 수/시간 (엔진 이벤트)
+  - Jinja 템플릿 렌더 시간 (Flask 시그널)
+  - 사진 헬퍼의 파일시스템 호출 수 (PhotoCatalog.on_fs)
+를 모으고 /metrics 에 Prometheus 텍스트 형식으로 내보낸다.
+/metrics 는 METRICS_TOKEN 이 있을 때만 열린다 (Authorization: Bearer <token>). 없으면 404.
+
+PROFILE_SLOW_MS > 0 이면 샘플링 프로파일러가 켜진다. 프로세스당 스레드 하나가
+PROFILE_INTERVAL_MS 마다 처리 중인 요청 스레드의 스택을 찍고, 임계값을 넘긴 요청만
+flamegraph.pl / speedscope 로 열 수 있는 collapsed stack(.folded) 파일로 남긴다.
+지표는 워커 프로세스별이다.
+"""
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+
+from flask import Response, abort, before_render_template, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current = contextvars.ContextVar("hbd_request_record", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestRecord:
+    __slots__ = ("endpoint", "start", "db_queries", "db_time", "template_time",
+                 "fs_calls", "samples", "_query_start", "_render_start")
+
+    def __init__(self):
+        self.endpoint = "unmatched"
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.fs_calls = 0
+        self.samples = {}  # {collapsed stack: count}
+        self._query_start = []
+        self._render_start = []
+
+
+def note_fs(op: str = ""):
+    """현재 요청의 파일시스템 호출 1회 기록 (계측이 꺼져 있으면 아무 일도 안 함)."""
+    rec = _current.get()
+    if rec is not None:
+        rec.fs_calls += 1
+
+
+class _EndpointStats:
+    __slots__ = ("count", "wall_sum", "wall_max", "buckets", "db_queries", "db_time",
+                 "template_time", "fs_calls")
+
+    def __init__(self):
+        self.count = 0
+        self.wall_sum = 0.0
+        self.wall_max = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.fs_calls = 0
+
+
+class _ClosingIterable:
+    """응답 본문 전송이 끝났을 때(close) 콜백을 부른다."""
+
+    def __init__(self, iterable, on_close):
+        self._iterable = iterable
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._on_close()
+
+
+def _hook_close(result, on_close):
+    """
+    wsgi.file_wrapper 응답은 감싸지 않고 인스턴스의 close만 바꾼다.
+    서버가 isinstance로 파일 래퍼를 알아보고 sendfile로 보내는 경로를 막지 않기 위해.
+    """
+    inner = getattr(result, "close", None)
+
+    def close():
+        try:
+            if inner is not None:
+                inner()
+        finally:
+            on_close()
+
+    try:
+        result.close = close
+    except AttributeError:  # __slots__ 등으로 바꿀 수 없으면 일반 경로 (sendfile은 포기)
+        return _ClosingIterable(result, on_close)
+    return result
+
+
+class Instrumentation:
+    def __init__(self, app=None, slow_ms: float = 0, sample_interval_ms: float = 5,
+                 profile_dir: str = "profiles", metrics_token: str = ""):
+        self.slow_ms = slow_ms
+        self.sample_interval = sample_interval_ms / 1000.0
+        self.profile_dir = profile_dir
+        self.metrics_token = metrics_token
+        self.slow_profiled = 0
+        self._stats = {}  # {endpoint: _EndpointStats}
+        self._lock = threading.Lock()
+        self._active = {}  # {thread id: RequestRecord} — 샘플러용
+        self._sampler_pid = None
+        self._collectors = []  # () -> [Prometheus 줄] (DB 풀 지표 등)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.wsgi_app = self._wrap(app.wsgi_app)
+        app.extensions["instrumentation"] = self
+
+        @app.before_request
+        def _mark_endpoint():
+            rec = _current.get()
+            if rec is not None:
+                rec.endpoint = request.endpoint or "unmatched"
+
+        before_render_template.connect(self._on_render_start, app, weak=False)
+        template_rendered.connect(self._on_render_end, app, weak=False)
+        # 엔진 클래스 단위로 걸어 두면 나중에 만들어지는 엔진(읽기 전용 등)도 함께 잡힌다
+        event.listen(Engine, "before_cursor_execute", self._on_query_start)
+        event.listen(Engine, "after_cursor_execute", self._on_query_end)
+
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+        if not self.metrics_token:
+            print("⚠️ METRICS_TOKEN 미설정: /metrics 는 꺼져 있음 (404)")
+
+    def add_collector(self, fn):
+        """/metrics 에 덧붙일 지표 함수 등록: fn() -> list[str]"""
+        self._collectors.append(fn)
+
+    # ---------- 이벤트 훅 ----------
+    @staticmethod
+    def _on_render_start(sender, **extra):
+        rec = _current.get()
+        if rec is not None:
+            rec._render_start.append(time.perf_counter())
+
+    @staticmethod
+    def _on_render_end(sender, **extra):
+        rec = _current.get()
+        if rec is not None and rec._render_start:
+            rec.template_time += time.perf_counter() - rec._render_start.pop()
+
+    @staticmethod
+    def _on_query_start(conn, cursor, statement, parameters, context, executemany):
+        rec = _current.get()
+        if rec is not None:
+            rec._query_start.append(time.perf_counter())
+
+    @staticmethod
+    def _on_query_end(conn, cursor, statement, parameters, context, executemany):
+        rec = _current.get()
+        if rec is not None and rec._query_start:
+            rec.db_queries += 1
+            rec.db_time += time.perf_counter() - rec._query_start.pop()
+
+    # ---------- WSGI ----------
+    def _wrap(self, wsgi_app):
+        def middleware(environ, start_response):
+            rec = RequestRecord()
+            tid = threading.get_ident()
+            token = _current.set(rec)
+            if self.slow_ms:
+                self._ensure_sampler()
+                self._active[tid] = rec
+            try:
+                result = wsgi_app(environ, start_response)
+            except Exception:
+                self._finish(rec, tid)
+                raise
+            finally:
+                _current.reset(token)
+            on_close = lambda: self._finish(rec, tid)
+            file_wrapper = environ.get("wsgi.file_wrapper")
+            if isinstance(file_wrapper, type) and isinstance(result, file_wrapper):
+                return _hook_close(result, on_close)
+            return _ClosingIterable(result, on_close)
+        return middleware
+
+    def _finish(self, rec: RequestRecord, tid: int):
+        wall = time.perf_counter() - rec.start
+        self._active.pop(tid, None)
+        with self._lock:
+            st = self._stats.get(rec.endpoint)
+            if st is None:
+                st = self._stats[rec.endpoint] = _EndpointStats()
+            st.count += 1
+            st.wall_sum += wall
+            st.wall_max = max(st.wall_max, wall)
+            for i, le in enumerate(DURATION_BUCKETS):
+                if wall <= le:
+                    st.buckets[i] += 1
+            st.db_queries += rec.db_queries
+            st.db_time += rec.db_time
+            st.template_time += rec.template_time
+            st.fs_calls += rec.fs_calls
+        if self.slow_ms and wall * 1000 >= self.slow_ms and rec.samples:
+            self._dump_profile(rec, wall)
+
+    # ---------- 샘플링 프로파일러 ----------
+    def _ensure_sampler(self):
+        if self._sampler_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sampler_pid == os.getpid():
+                return
+            self._sampler_pid = os.getpid()
+            self._active.clear()
+            threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True).start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            for tid, rec in list(self._active.items()):
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = _collapse(frame)
+                rec.samples[stack] = rec.samples.get(stack, 0) + 1
+
+    def _dump_profile(self, rec: RequestRecord, wall: float):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{rec.endpoint}-{int(wall * 1000)}ms.folded"
+            with open(os.path.join(self.profile_dir, name), "w", encoding="utf-8") as f:
+                for stack, count in sorted(rec.samples.copy().items()):
+                    f.write(f"{stack} {count}\n")
+            with self._lock:
+                self.slow_profiled += 1
+        except Exception as e:
+            print("⚠️ profile dump error:", e)
+
+    # ---------- 내보내기 ----------
+    def metrics_view(self):
+        # 토큰이 없으면 끔 — 엔드포인트 목록/지연 분포가 아무에게나 보이지 않도록
+        if not self.metrics_token:
+            abort(404)
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth.encode(), f"Bearer {self.metrics_token}".encode()):
+            abort(404)
+        return Response(self.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stats = {k: _copy_stats(v) for k, v in self._stats.items()}
+            slow = self.slow_profiled
+        out = [
+            "# HELP hbd_request_duration_seconds Request wall time per endpoint.",
+            "# TYPE hbd_request_duration_seconds histogram",
+        ]
+        for ep, st in sorted(stats.items()):
+            for le, n in zip(DURATION_BUCKETS, st.buckets):
+                out.append(f'hbd_request_duration_seconds_bucket{{endpoint="{ep}",le="{le}"}} {n}')
+            out.append(f'hbd_request_duration_seconds_bucket{{endpoint="{ep}",le="+Inf"}} {st.count}')
+            out.append(f'hbd_request_duration_seconds_sum{{endpoint="{ep}"}} {st.wall_sum:.6f}')
+            out.append(f'hbd_request_duration_seconds_count{{endpoint="{ep}"}} {st.count}')
+        counters = (
+            ("hbd_request_duration_seconds_max", "gauge", "Slowest request seen per endpoint.", "wall_max"),
+            ("hbd_db_queries_total", "counter", "SQL statements executed per endpoint.", "db_queries"),
+            ("hbd_db_query_seconds_total", "counter", "Time spent in SQL per endpoint.", "db_time"),
+            ("hbd_template_render_seconds_total", "counter", "Time spent rendering Jinja templates per endpoint.", "template_time"),
+            ("hbd_photo_fs_calls_total", "counter", "Filesystem calls made by photo helpers per endpoint.", "fs_calls"),
+        )
+        for name, kind, help_text, attr in counters:
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for ep, st in sorted(stats.items()):
+                v = getattr(st, attr)
+                out.append(f'{name}{{endpoint="{ep}"}} {v:.6f}' if isinstance(v, float) else f'{name}{{endpoint="{ep}"}} {v}')
+        out.append("# HELP hbd_slow_requests_profiled_total Slow requests dumped as collapsed stacks.")
+        out.append("# TYPE hbd_slow_requests_profiled_total counter")
+        out.append(f"hbd_slow_requests_profiled_total {slow}")
+        for fn in self._collectors:
+            try:
+                out.extend(fn())
+            except Exception as e:
+                print("⚠️ metrics collector error:", e)
+        return "\n".join(out) + "\n"
+
+
+def _copy_stats(st: _EndpointStats) -> _EndpointStats:
+    c = _EndpointStats()
+    for k in _EndpointStats.__slots__:
+        v = getattr(st, k)
+        setattr(c, k, list(v) if isinstance(v, list) else v)
+    return c
+
+
+def _collapse(frame) -> str:
+    """루트→리프 순서의 'module:function' 세미콜론 스택 (flamegraph collapsed 형식)"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        parts.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
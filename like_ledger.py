@@ -0,0 +1,107 @@
+# like_ledger.py
+"""
+좋아요 장부: 어떤 방문자가 어떤 메시지에 좋아요를 눌렀는지 message_like 테이블에 둔다.
+
+예전에는 좋아요한 id 목록 전체를 서명된 세션 쿠키에 넣어서 쿠키가 계속 커졌다.
+이제 쿠키에는 짧은 익명 방문자 id만 남고, 중복 좋아요는 (visitor_id, message_id)
+기본 키가 DB에서 막는다(여러 탭/워커가 동시에 눌러도 한 번만 반영).
+
+방문자별 좋아요 목록은 프로세스 메모리에 LRU로 캐시한다. 항목은 그 방문자의 좋아요 버전
+(세션에 든 카운터, 본인이 좋아요를 바꿀 때만 증가)과 함께 저장된다. 다른 방문자의 좋아요는
+이 캐시를 건드리지 않고, 본인이 다른 워커에서 바꿨으면 쿠키의 버전이 달라져 다시 읽는다.
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import MessageLike, db
+
+_like = MessageLike.__table__
+
+
+class LikeLedger:
+    def __init__(self, max_visitors: int = 10000):
+        self.max_visitors = max_visitors
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # {visitor_id: (version, frozenset(message ids))}
+
+    # ---------- 조회 ----------
+    def liked_ids(self, visitor_id: str | None, version=None) -> frozenset:
+        """방문자가 좋아요한 메시지 id 집합 (기본 키 앞부분 인덱스로 한 번에 조회)."""
+        if not visitor_id:
+            return frozenset()
+        with self._lock:
+            hit = self._cache.get(visitor_id)
+            if hit is not None and hit[0] == version:
+                self._cache.move_to_end(visitor_id)
+                return hit[1]
+        with db.engine.connect() as conn:
+            ids = frozenset(conn.execute(
+                select(_like.c.message_id).where(_like.c.visitor_id == visitor_id)
+            ).scalars())
+        with self._lock:
+            self._cache[visitor_id] = (version, ids)
+            self._cache.move_to_end(visitor_id)
+            while len(self._cache) > self.max_visitors:
+                self._cache.popitem(last=False)
+        return ids
+
+    # ---------- 기록 ----------
+    def record(self, conn, visitor_id: str, message_id: int, liked: bool) -> bool:
+        """
+        호출자의 트랜잭션(conn) 안에서 좋아요 기록/취소. 실제로 바뀌었으면 True.
+        커밋 후 forget_visitor()는 호출자가 부른다.
+        """
+        if not liked:
+            return conn.execute(delete_stmt(visitor_id, message_id)).rowcount == 1
+        row = {"visitor_id": visitor_id, "message_id": message_id}
+        stmt = insert_ignore_stmt(conn.dialect.name, row)
+        if stmt is not None:
+            return conn.execute(stmt).rowcount == 1
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(_like).values(**row))
+            return True
+        except IntegrityError:
+            return False
+
+    def add(self, visitor_id: str, message_id: int) -> bool:
+        """좋아요 기록(단독 트랜잭션). 새로 기록됐으면 True (이미 있으면 False)."""
+        with db.engine.begin() as conn:
+            added = self.record(conn, visitor_id, message_id, True)
+        self.forget_visitor(visitor_id)
+        return added
+
+    def add_many(self, visitor_id: str, message_ids):
+        """예전 쿠키(liked_msgs)에 있던 좋아요를 장부로 옮길 때 사용 (카운트는 이미 반영돼 있음)."""
+        for mid in message_ids:
+            try:
+                self.add(visitor_id, int(mid))
+            except Exception as e:
+                print("⚠️ like ledger import error:", e)
+
+    def forget_message(self, message_id: int):
+        """메시지 삭제 시 장부 정리 (SQLite는 FK CASCADE가 꺼져 있을 수 있음)."""
+        with db.engine.begin() as conn:
+            conn.execute(delete(_like).where(_like.c.message_id == message_id))
+
+    def forget_visitor(self, visitor_id: str):
+        """이 프로세스의 방문자 캐시 무효화 (장부를 직접 바꾼 쪽이 호출)"""
+        with self._lock:
+            self._cache.pop(visitor_id, None)
+
+
+def insert_ignore_stmt(dialect_name: str, row: dict):
+    """이미 있으면 아무 일도 안 하는 INSERT (sqlite/postgresql). 지원 안 하는 DB면 None."""
+    if dialect_name == "sqlite":
+        return sqlite.insert(_like).values(**row).on_conflict_do_nothing()
+    if dialect_name == "postgresql":
+        return postgresql.insert(_like).values(**row).on_conflict_do_nothing()
+    return None
+
+
+def delete_stmt(visitor_id: str, message_id: int):
+    return delete(_like).where(_like.c.visitor_id == visitor_id, _like.c.message_id == message_id)
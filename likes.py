@@ -0,0 +1,165 @@
+# likes.py
+"""
+좋아요 카운터 엔진.
+
+ORM으로 행을 읽어 파이썬에서 +1 하고 커밋하던 방식(read-modify-write)은
+여러 Gunicorn 워커가 동시에 누르면 좋아요가 유실된다.
+여기서는 DB가 직접 `like_count = like_count + :delta` 를 계산하게 해서 원자적으로 반영한다.
+
+flush_ms > 0 이면 write-behind 모드:
+요청은 메모리의 메시지별 delta에 합산만 하고, 백그라운드 스레드가
+flush_ms 마다 모인 delta를 executemany 한 번으로 DB에 반영한다.
+"""
+import atexit
+import os
+import threading
+import time
+
+from sqlalchemy import bindparam, case, func, select, update
+
+from models import Message, db
+
+_message = Message.__table__
+
+
+def _like_update_stmt():
+    """UPDATE message SET like_count = max(0, like_count + :delta) WHERE id = :mid"""
+    current = func.coalesce(_message.c.like_count, 0)
+    delta = bindparam("delta")
+    return (
+        update(_message)
+        .where(_message.c.id == bindparam("mid"))
+        .values(like_count=case((current + delta < 0, 0), else_=current + delta))
+    )
+
+
+class LikeEngine:
+    def __init__(self, app=None, flush_ms: int = 0):
+        self.app = None
+        self.flush_ms = flush_ms
+        # 반영 직후 호출: on_flush({message_id: new_count})
+        self.on_flush = None
+        self._stmt = _like_update_stmt()
+        self._pending = {}  # {message_id: delta}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["like_engine"] = self
+        atexit.register(self.flush)
+
+    @property
+    def write_behind(self) -> bool:
+        return self.flush_ms > 0
+
+    # ---------- 공개 API ----------
+    def apply(self, message_id: int, delta: int):
+        """
+        delta를 반영하고 현재 좋아요 수를 반환한다. 메시지가 없으면 None.
+        write-behind 모드에서는 'DB 값 + 이 워커의 미반영 delta'를 돌려준다.
+        """
+        if not self.write_behind:
+            with db.engine.begin() as conn:
+                count = self.apply_in(conn, message_id, delta)
+            if count is not None:
+                self._notify({message_id: count})
+            return count
+
+        persisted = self._read_count(message_id)
+        if persisted is None:
+            return None
+        with self._lock:
+            pending = self._pending.get(message_id, 0) + delta
+            self._pending[message_id] = pending
+        self._ensure_flusher()
+        return max(0, persisted + pending)
+
+    def current(self, message_id: int):
+        """현재 좋아요 수(미반영 delta 포함). 메시지가 없으면 None."""
+        persisted = self._read_count(message_id)
+        if persisted is None:
+            return None
+        with self._lock:
+            pending = self._pending.get(message_id, 0)
+        return max(0, persisted + pending)
+
+    def flush(self):
+        """모인 delta를 한 번의 배치 UPDATE로 반영한다."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        batch = {mid: d for mid, d in batch.items() if d}
+        if not batch:
+            return
+        params = [{"mid": mid, "delta": d} for mid, d in batch.items()]
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(self._stmt, params)
+                    counts = dict(conn.execute(
+                        select(_message.c.id, _message.c.like_count).where(_message.c.id.in_(list(batch)))
+                    ).all())
+        except Exception as e:
+            print("⚠️ like flush error:", e)
+            # 실패한 delta는 다음 주기에 다시 시도
+            with self._lock:
+                for mid, d in batch.items():
+                    self._pending[mid] = self._pending.get(mid, 0) + d
+            return
+        self._notify(counts)
+
+    def apply_in(self, conn, message_id: int, delta: int):
+        """
+        즉시 모드: 호출자의 트랜잭션(conn) 안에서 delta를 반영하고 새 좋아요 수를 반환한다.
+        (장부 INSERT/DELETE와 같은 트랜잭션으로 묶기 위함. 커밋 후 notify()는 호출자가.)
+        """
+        args = {"mid": message_id, "delta": delta}
+        if conn.dialect.update_returning:
+            row = conn.execute(self._stmt.returning(_message.c.like_count), args).first()
+            return row[0] if row else None
+        if conn.execute(self._stmt, args).rowcount == 0:
+            return None
+        return conn.execute(
+            select(_message.c.like_count).where(_message.c.id == message_id)
+        ).scalar()
+
+    def notify(self, changed: dict):
+        """apply_in()을 쓴 호출자가 커밋 후 on_flush 훅을 부를 때"""
+        self._notify(changed)
+
+    # ---------- 내부 ----------
+
+    def _read_count(self, message_id: int):
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(func.coalesce(_message.c.like_count, 0)).where(_message.c.id == message_id)
+            ).first()
+        return row[0] if row else None
+
+    def _notify(self, changed: dict):
+        if self.on_flush is None:
+            return
+        try:
+            self.on_flush(changed)
+        except Exception as e:
+            print("⚠️ like on_flush error:", e)
+
+    def _ensure_flusher(self):
+        # fork 이후(Gunicorn 워커)에는 스레드가 따라오지 않으므로 pid로 확인해서 다시 띄운다
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="like-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = self.flush_ms / 1000.0
+        while True:
+            time.sleep(interval)
+            self.flush()
@@ -0,0 +1,196 @@
+# live_feed.py
+"""
+방명록/좋아요 실시간 피드 (Server-Sent Events).
+
+구독자마다 큐나 스레드를 두지 않는다. 최근 이벤트를 순번(seq)과 함께 링 버퍼에 쌓고,
+구독자는 '마지막으로 받은 seq' 하나만 들고 Condition에서 기다린다.
+publish 한 번에 모든 대기자가 깨어나 각자 버퍼에서 뒷부분만 읽어 간다(fan-out).
+끊겼다 다시 붙은 탭은 Last-Event-ID("<epoch>-<seq>")로 놓친 이벤트를 이어 받는다.
+epoch가 다르면(다른 워커/재시작) 순번이 호환되지 않으므로 현재 시점부터 받는다.
+
+여러 워커/프로세스 간 전달은 PostgreSQL LISTEN/NOTIFY 브리지(선택)로 한다.
+브리지를 켜면 publish는 NOTIFY만 보내고, 프로세스당 리스너 스레드 1개가 받아서 로컬 버퍼에 넣는다.
+
+ASGI 모드(asgi.py)에서는 AsyncWaiter가 이벤트 루프에서 기다린다(구독자마다 스레드 없음).
+"""
+import json
+import os
+import select
+import secrets
+import threading
+import time
+from collections import deque
+
+PG_CHANNEL = "hbd_live"
+
+
+class LiveFeed:
+    def __init__(self, buffer_size: int = 1000):
+        self._events = deque(maxlen=buffer_size)  # [(seq, event)]
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._bridge = None  # PgNotifyBridge
+        self._token = secrets.token_hex(4)
+        self._listeners = []  # 새 이벤트마다 호출 (스레드 무관, 빨리 끝나야 함)
+
+    @property
+    def head(self) -> int:
+        return self._seq
+
+    @property
+    def epoch(self) -> str:
+        # fork된 워커끼리도 구분되도록 pid를 붙인다
+        return f"{self._token}{os.getpid():x}"
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def cursor_from_event_id(self, last_event_id: str | None) -> int:
+        """Last-Event-ID → 이 프로세스 기준 seq. 해석할 수 없으면 현재 시점."""
+        if last_event_id:
+            epoch, _, seq = last_event_id.rpartition("-")
+            if epoch == self.epoch and seq.isdigit():
+                return min(int(seq), self._seq)
+        return self._seq
+
+    def publish(self, event_type: str, **data):
+        event = {"type": event_type, **data}
+        if self._bridge is not None:
+            self._bridge.send(event)
+        else:
+            self._append(event)
+
+    def _append(self, event: dict):
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event))
+            self._cond.notify_all()
+        for fn in list(self._listeners):
+            fn()
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def ensure_listener(self):
+        """PG 브리지를 쓰면 이 프로세스의 LISTEN 스레드를 보장한다."""
+        if self._bridge is not None:
+            self._bridge.ensure_listener()
+
+    def since(self, last_seq: int):
+        """last_seq 이후 이벤트 목록과 새 커서. 버퍼에서 밀려난 구간은 건너뛴다."""
+        with self._cond:
+            return self._since_locked(last_seq)
+
+    def _since_locked(self, last_seq: int):
+        events = [(seq, ev) for seq, ev in self._events if seq > last_seq]
+        return events, self._seq
+
+    def wait(self, last_seq: int, timeout: float):
+        """새 이벤트가 올 때까지(최대 timeout초) 기다린다. (events, new_last_seq)"""
+        self.ensure_listener()
+        with self._cond:
+            if self._seq == last_seq:
+                self._cond.wait(timeout)
+            return self._since_locked(last_seq)
+
+    def enable_pg_bridge(self, dsn: str):
+        self._bridge = PgNotifyBridge(self, dsn)
+
+
+class AsyncWaiter:
+    """
+    이벤트 루프용 대기: 루프당 하나. publish(어느 스레드든)가 call_soon_threadsafe로
+    현재 asyncio.Event를 깨우고 새 Event로 바꾼다. 모든 구독 코루틴이 같은 Event를 기다린다.
+    """
+
+    def __init__(self, feed: LiveFeed, loop: "asyncio.AbstractEventLoop"):
+        import asyncio  # ASGI 쪽에서만 쓰므로 WSGI 앱 import 시간에 넣지 않는다
+
+        self._asyncio = asyncio
+        self.feed = feed
+        self.loop = loop
+        self._event = asyncio.Event()
+        feed.add_listener(lambda: loop.call_soon_threadsafe(self._wake))
+
+    def _wake(self):
+        self._event.set()
+        self._event = self._asyncio.Event()
+
+    async def wait(self, last_seq: int, timeout: float):
+        self.feed.ensure_listener()
+        events, head = self.feed.since(last_seq)
+        if events or head != last_seq:
+            return events, head
+        event = self._event
+        try:
+            await self._asyncio.wait_for(event.wait(), timeout)
+        except self._asyncio.TimeoutError:
+            pass
+        return self.feed.since(last_seq)
+
+
+class PgNotifyBridge:
+    """PostgreSQL NOTIFY로 워커 간 이벤트 전달 (psycopg2 필요)."""
+
+    def __init__(self, feed: LiveFeed, dsn: str):
+        self.feed = feed
+        self.dsn = dsn
+        self._listener = None
+        self._pid = None
+        self._send_conn = None
+        self._lock = threading.Lock()
+
+    def send(self, event: dict):
+        import psycopg2
+
+        self.ensure_listener()
+        payload = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            try:
+                if self._send_conn is None or self._send_conn.closed:
+                    self._send_conn = psycopg2.connect(self.dsn)
+                    self._send_conn.autocommit = True
+                with self._send_conn.cursor() as cur:
+                    cur.execute("SELECT pg_notify(%s, %s)", (PG_CHANNEL, payload))
+            except Exception as e:
+                print("⚠️ live feed notify error:", e)
+                self._send_conn = None
+                self.feed._append(event)  # 최소한 같은 워커의 구독자에게는 전달
+
+    def ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._send_conn = None  # fork 이전 연결은 재사용하지 않는다
+            self._listener = threading.Thread(target=self._listen, name="live-feed-listen", daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+
+        while True:
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {PG_CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        n = conn.notifies.pop(0)
+                        try:
+                            self.feed._append(json.loads(n.payload))
+                        except ValueError:
+                            pass
+            except Exception as e:
+                print("⚠️ live feed listen error:", e)
+                time.sleep(2)
+
+
+def format_sse(event_id: str, event: dict) -> str:
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
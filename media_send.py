@@ -0,0 +1,159 @@
+# media_send.py
+"""
+사진/정적 파일 전송.
+
+MEDIA_SEND_MODE
+  - "python"(기본): 워커가 직접 보낸다. 파일 객체를 wsgi.file_wrapper로 넘겨서
+    Gunicorn이 os.sendfile()로 커널에서 바로 보내게 한다. Range 요청(206)도 직접 처리한다.
+    (Werkzeug의 기본 Range 처리는 파일을 파이썬 이터레이터로 감싸 sendfile을 못 쓴다.)
+  - "accel": X-Accel-Redirect 헤더만 돌려주고 바이트 전송은 Nginx가 한다.
+  - "sendfile": X-Sendfile(Apache mod_xsendfile / lighttpd)에 절대 경로를 준다.
+accel/sendfile 모드에서는 워커가 권한 확인과 헤더만 처리하고 Range/조건부 요청은 프록시가 맡는다.
+
+Nginx 예 (MEDIA_ACCEL_PREFIX=/_protected):
+
+    location /_protected/photos_edit/ { internal; alias /srv/hbd/media_example/photos_edit/; }
+    location /_protected/blobs/       { internal; alias /srv/hbd/media_example/blobs/; }
+    location /_protected/static/      { internal; alias /srv/hbd/static_example/; gzip_static on; }
+
+(미리 압축된 .gz/.br 사본 선택은 python 모드에서만 앱이 하고, accel 모드에서는 gzip_static/brotli_static에 맡긴다.)
+"""
+import mimetypes
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from flask import Response, abort, request
+from werkzeug.http import http_date, is_resource_modified
+from werkzeug.security import safe_join
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaSender:
+    def __init__(self, mode: str = "python", accel_prefix: str = "/_protected"):
+        if mode not in ("python", "accel", "sendfile"):
+            raise ValueError(f"unknown MEDIA_SEND_MODE: {mode}")
+        self.mode = mode
+        self.accel_prefix = accel_prefix.rstrip("/")
+        self.roots = {}  # {이름: 실제 폴더} — accel 내부 location 이름
+
+    def add_root(self, name: str, directory: str):
+        self.roots[name] = directory
+
+    @property
+    def offloaded(self) -> bool:
+        return self.mode != "python"
+
+    def send(self, root: str, filename: str, max_age: int | None = None, immutable: bool = False,
+             mimetype: str | None = None):
+        directory = self.roots[root]
+        path = safe_join(directory, filename)
+        if path is None:
+            abort(404)
+        mimetype = mimetype or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+        if self.mode == "accel":
+            resp = Response(mimetype=mimetype)
+            rel = os.path.relpath(path, directory).replace(os.sep, "/")
+            resp.headers["X-Accel-Redirect"] = f"{self.accel_prefix}/{root}/{quote(rel)}"
+        elif self.mode == "sendfile":
+            resp = Response(mimetype=mimetype)
+            resp.headers["X-Sendfile"] = os.path.abspath(path)
+        else:
+            resp = self._send_python(path, mimetype)
+        if max_age is not None and resp.status_code in (200, 206, 304):
+            resp.cache_control.public = True
+            resp.cache_control.max_age = max_age
+            if immutable:
+                resp.cache_control.immutable = True
+        return resp
+
+    # ---------- 워커가 직접 전송 ----------
+    @staticmethod
+    def _send_python(path: str, mimetype: str) -> Response:
+        try:
+            f = open(path, "rb")
+        except (FileNotFoundError, IsADirectoryError, PermissionError):
+            abort(404)
+        try:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            mtime = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)  # HTTP 날짜는 초 단위
+            etag = f"{st.st_mtime_ns:x}-{size:x}"
+            headers = {
+                "ETag": f'"{etag}"',
+                "Last-Modified": http_date(mtime),
+                "Accept-Ranges": "bytes",
+            }
+            if not is_resource_modified(request.environ, etag=etag, last_modified=mtime):
+                f.close()
+                return Response(status=304, headers=headers)
+
+            start, stop = 0, size
+            status = 200
+            rng = request.range
+            if rng is not None and len(rng.ranges) == 1 and _if_range_ok(etag, mtime):
+                bounds = rng.range_for_length(size)
+                if bounds is None:
+                    f.close()
+                    headers["Content-Range"] = f"bytes */{size}"
+                    return Response(status=416, headers=headers)
+                start, stop = bounds
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+            length = stop - start
+
+            if request.method == "HEAD":
+                f.close()
+                body = []
+            else:
+                f.seek(start)
+                body = _file_body(f, length, stop == size)
+            resp = Response(body, status=status, mimetype=mimetype, headers=headers, direct_passthrough=True)
+            resp.content_length = length
+            return resp
+        except BaseException:
+            f.close()
+            raise
+
+
+def _if_range_ok(etag: str, mtime: datetime) -> bool:
+    """If-Range가 현재 파일과 맞을 때만 부분 응답 (아니면 전체를 보냄)"""
+    if "If-Range" not in request.headers:
+        return True
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    return if_range.date is not None and mtime <= if_range.date
+
+
+def _file_body(f, length: int, to_eof: bool):
+    """
+    파일 끝까지 보내는 경우와 Gunicorn(Content-Length만큼 sendfile)은 wsgi.file_wrapper로,
+    그 밖의 서버에서 중간 구간만 보낼 때는 길이만큼만 읽는 이터레이터로.
+    """
+    wrapper = request.environ.get("wsgi.file_wrapper")
+    server = request.environ.get("SERVER_SOFTWARE", "")
+    if wrapper is not None and (to_eof or server.startswith("gunicorn")):
+        return wrapper(f, CHUNK_SIZE)
+    return _RangeReader(f, length)
+
+
+class _RangeReader:
+    """close()가 있는 길이 제한 이터레이터 (WSGI 서버가 다 보낸 뒤 파일을 닫는다)"""
+
+    def __init__(self, f, length: int):
+        self.f = f
+        self.remaining = length
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.f.read(min(CHUNK_SIZE, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.f.close()
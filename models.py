@@ -4,7 +4,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+# 세션이 @read_only 뷰의 조회를 replica로 보낼 수 있게 (db_routing 참고)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # 공통 타임스탬프
 class TimestampMixin:
@@ -40,6 +43,13 @@ class Message(TimestampMixin, db.Model):
     pin_hash = db.Column(db.String(255), nullable=True)
     like_count = db.Column(db.Integer, nullable=False, default=0)
 
+# 방명록 좋아요 기록(익명 방문자 id × 메시지) — 세션 쿠키 대신 서버에 보관
+class MessageLike(db.Model):
+    __tablename__ = "message_like"
+
+    visitor_id = db.Column(db.String(32), primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey("message.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
 
 # 생일자 전용 메시지(유튜브 아래 편집 영역)
 class BirthdayNote(TimestampMixin, db.Model):
@@ -0,0 +1,225 @@
+# notifier.py
+"""
+Slack 웹훅 알림 디스패처.
+
+알림마다 스레드를 새로 띄우던 방식 대신, 프로세스당 하나의 디스패처가
+  - 크기 제한 큐(가득 차면 새 알림을 버리고 dropped 카운트)
+  - 고정 개수 워커 스레드
+  - 실패 시 지수 백오프 재시도
+  - coalesce_window 초 안에 들어온 알림을 한 메시지로 합치기
+를 담당한다.
+
+오프라인 확인용 로컬 싱크:
+    python notifier.py sink --port 8765 [--delay 0.5] [--fail-rate 0.2]
+    python notifier.py burst --url http://127.0.0.1:8765/ --events 500
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+
+def post_json(url: str, payload: dict, timeout: float = 3.0):
+    import urllib.request  # 첫 전송 때 (앱 콜드 스타트 경로에서 빼기 위해)
+
+    data = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(req, timeout=timeout).read()
+
+
+class SlackDispatcher:
+    def __init__(self, url: str = "", workers: int = 2, maxsize: int = 256,
+                 coalesce_window: float = 2.0, max_batch: int = 20,
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 3.0,
+                 post=post_json):
+        self.url = url
+        self.workers = workers
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.post = post
+        self.stats = {"queued": 0, "dropped": 0, "sent": 0, "batches": 0, "failed": 0}
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+    # ---------- 공개 API ----------
+    def submit(self, text: str) -> bool:
+        """알림을 큐에 넣는다. 큐가 가득 차면 버리고 False (요청 스레드는 절대 막히지 않음)."""
+        if not self.url:
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    def join(self, timeout: float = 10.0) -> bool:
+        """큐가 빌 때까지 대기 (테스트/종료용). 시간 내에 비면 True."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    # ---------- 내부 ----------
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _ensure_workers(self):
+        # fork 이후(Gunicorn 워커)에는 스레드가 따라오지 않으므로 pid로 확인해서 다시 띄운다
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"slack-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+
+    def _collect_batch(self) -> list[str]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.coalesce_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, text: str) -> bool:
+        for attempt in range(self.retries + 1):
+            try:
+                self.post(self.url, {"text": text}, timeout=self.timeout)
+                return True
+            except Exception as e:
+                if attempt == self.retries:
+                    print("⚠️ slack notify error:", e)
+                    return False
+                time.sleep(self.backoff * (2 ** attempt))
+        return False
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                text = batch[0] if len(batch) == 1 else "\n\n".join(batch)
+                if self._send(text):
+                    self._count("sent", len(batch))
+                    self._count("batches")
+                else:
+                    self._count("failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+# ====== 로컬 싱크 (Slack 대역) ======
+class LocalSlackSink:
+    """받은 웹훅 본문을 기록하는 로컬 HTTP 서버. delay/fail_rate로 느린·불안정한 Slack을 흉내낸다."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, fail_rate: float = 0.0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.received = []
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if delay:
+                    time.sleep(delay)
+                if fail_rate and random.random() < fail_rate:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                sink.received.append(json.loads(body or b"{}"))
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _burst(args):
+    d = SlackDispatcher(args.url, workers=args.workers, maxsize=args.queue,
+                        coalesce_window=args.window, retries=args.retries)
+    t0 = time.perf_counter()
+    for i in range(args.events):
+        d.submit(f"📝 burst event {i}")
+    accepted = time.perf_counter() - t0
+    d.join(timeout=args.timeout)
+    total = time.perf_counter() - t0
+    print(json.dumps({
+        **d.stats,
+        "events": args.events,
+        "submit_seconds": round(accepted, 4),
+        "drain_seconds": round(total, 3),
+        "events_per_second": round(d.stats["sent"] / total, 1) if total else None,
+    }))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Slack 알림 디스패처 로컬 점검 도구")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    ps = sub.add_parser("sink", help="로컬 웹훅 싱크 실행")
+    ps.add_argument("--port", type=int, default=8765)
+    ps.add_argument("--delay", type=float, default=0.0)
+    ps.add_argument("--fail-rate", type=float, default=0.0)
+
+    pb = sub.add_parser("burst", help="알림 폭주를 흘려 처리량/드롭 측정")
+    pb.add_argument("--url", default="")
+    pb.add_argument("--events", type=int, default=500)
+    pb.add_argument("--workers", type=int, default=2)
+    pb.add_argument("--queue", type=int, default=256)
+    pb.add_argument("--window", type=float, default=0.2)
+    pb.add_argument("--retries", type=int, default=3)
+    pb.add_argument("--timeout", type=float, default=30.0)
+
+    args = p.parse_args()
+    if args.cmd == "sink":
+        sink = LocalSlackSink(port=args.port, delay=args.delay, fail_rate=args.fail_rate)
+        print(f"🧪 local slack sink on {sink.url}")
+        try:
+            sink.server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"received {len(sink.received)} posts")
+    else:
+        if not args.url:
+            sink = LocalSlackSink().start()
+            args.url = sink.url
+        _burst(args)
@@ -0,0 +1,120 @@
+# photo_catalog.py
+"""
+사진 폴더 인메모리 인덱스.
+
+요청마다 listdir + 파일별 getmtime 하던 것을 대신해, 정렬된 (파일명, mtime) 목록과
+파생본 목록을 메모리에 들고 있다가 아래 경우에만 다시 읽는다.
+  - 앱 자신의 업로드/삭제/초기화 핸들러가 invalidate() 했을 때
+  - 외부에서 파일이 바뀌어 폴더 mtime이 달라졌을 때
+    (폴더 stat은 check_interval 초에 한 번만 → 요청당 syscall은 파일 수와 무관하게 O(1))
+
+cache(공유 캐시 네임스페이스)를 주면 (폴더, 폴더 mtime) 키로 목록을 공유해서
+폴더가 바뀌었을 때 워커마다 다시 scandir 하지 않고 처음 읽은 워커의 결과를 쓴다.
+"""
+import os
+import threading
+import time
+
+from images import derived_dir
+
+
+class PhotoCatalog:
+    def __init__(self, directory: str, allowed, seed=None, check_interval: float = 1.0, cache=None):
+        self.directory = directory
+        self.allowed = allowed
+        self.seed = seed  # 폴더가 없을 때 호출(예: ensure_edit_dir_seed)
+        self.check_interval = check_interval
+        self.cache = cache
+        self.on_fs = None  # 계측 훅: on_fs(op) — 파일시스템 호출마다
+        self._lock = threading.Lock()
+        self._files = []  # [(name, mtime)]
+        self._derived = frozenset()
+        self._stamp = None  # (폴더 mtime_ns, 파생본 폴더 mtime_ns)
+        self._checked_at = 0.0
+        self._dirty = True
+
+    def invalidate(self):
+        self._dirty = True
+
+    def snapshot(self):
+        """(files, derived_names) — files는 이름순 [(name, mtime)]"""
+        now = time.monotonic()
+        if not self._dirty and now - self._checked_at < self.check_interval:
+            return self._files, self._derived
+        with self._lock:
+            if self._dirty or now - self._checked_at >= self.check_interval:
+                stamp = self._dir_stamp()
+                if self._dirty or stamp != self._stamp:
+                    # 직접 invalidate() 한 경우엔 공유 캐시를 믿지 않고 다시 읽어서 덮어쓴다
+                    if self._dirty or not self._load_shared(stamp):
+                        self._refresh()
+                        stamp = self._dir_stamp()
+                        self._store_shared(stamp)
+                self._stamp = stamp
+                self._checked_at = now
+            return self._files, self._derived
+
+    def version(self):
+        """폴더 상태 지문 (ETag 계산용). snapshot()과 같은 주기로 갱신된다."""
+        files, _derived = self.snapshot()
+        return self._stamp, len(files)
+
+    def _shared_key(self, stamp):
+        if self.cache is None or stamp[0] is None:
+            return None
+        return f"{self.directory}:{stamp[0]}:{stamp[1]}"
+
+    def _load_shared(self, stamp) -> bool:
+        key = self._shared_key(stamp)
+        hit = self.cache.get(key) if key else None
+        if hit is None:
+            return False
+        self._files, self._derived = hit
+        return True
+
+    def _store_shared(self, stamp):
+        key = self._shared_key(stamp)
+        if key:
+            self.cache.set(key, (self._files, self._derived))
+
+    def _fs(self, op: str, n: int = 1):
+        if self.on_fs is not None:
+            for _ in range(n):
+                self.on_fs(op)
+
+    def _dir_stamp(self):
+        def mtime_ns(p):
+            self._fs("stat")
+            try:
+                return os.stat(p).st_mtime_ns
+            except OSError:
+                return None
+        return mtime_ns(self.directory), mtime_ns(derived_dir(self.directory))
+
+    def _refresh(self):
+        self._dirty = False
+        if not os.path.isdir(self.directory):
+            if self.seed is not None:
+                self.seed()
+            if not os.path.isdir(self.directory):
+                self._files, self._derived = [], frozenset()
+                return
+        files = []
+        self._fs("scandir")
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or not self.allowed(entry.name):
+                    continue
+                self._fs("stat")
+                try:
+                    mtime = int(entry.stat().st_mtime)
+                except OSError:
+                    mtime = 0
+                files.append((entry.name, mtime))
+        files.sort(key=lambda x: x[0].lower())
+        self._fs("listdir")
+        try:
+            derived = frozenset(os.listdir(derived_dir(self.directory)))
+        except OSError:
+            derived = frozenset()
+        self._files, self._derived = files, derived
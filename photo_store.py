@@ -0,0 +1,324 @@
+# photo_store.py
+"""
+내용 주소(content-addressed) 사진 저장소.
+
+업로드 본문은 Werkzeug가 multipart를 파싱하는 동안 바로 임시 파일로 흘려 쓰면서
+SHA-256을 함께 계산한다(두 번 읽지 않음). 크기 제한을 넘는 순간 413으로 중단한다.
+다 받은 뒤에는 매직 바이트(+ Pillow verify)로 이미지인지 확인하고
+blobs/<hash 앞 2자리>/<hash>.<ext> 로 옮긴다. 같은 내용이 이미 있으면 임시 파일만 버린다.
+
+편집 폴더의 보이는 파일(이름)은 blob에 대한 하드링크이고, 이름 → hash 매핑은 index.json에 둔다.
+index.json 갱신은 flock(index.lock)으로 워커 사이에서도 직렬화하고, 잠근 뒤 디스크에서 다시 읽는다.
+blob URL은 내용이 바뀌지 않으므로 영구 캐시할 수 있다.
+
+아래쪽 clone_tree / replace_dir 는 사진 초기화용이다. 원본 폴더를 옆 폴더에
+하드링크(안 되면 reflink, 최후엔 복사)로 복제한 뒤 한 번에 바꿔 끼운다.
+"""
+import contextlib
+import ctypes
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from images import HAS_PIL
+
+INDEX_NAME = "index.json"
+INDEX_LOCK_NAME = "index.lock"
+UPLOAD_PREFIX = ".upload-"
+
+FICLONE = 0x40049409  # linux/fs.h — btrfs/xfs/APFS 류의 copy-on-write 복제
+RENAME_EXCHANGE = 2
+AT_FDCWD = -100
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def sniff_image_ext(head: bytes) -> str | None:
+    """파일 앞부분으로 실제 형식을 판별한다 (확장자는 믿지 않음)."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class HashingUploadFile:
+    """Werkzeug 파일 스트림 대체: 쓰는 동안 해시/크기를 계산하고 한도를 넘으면 즉시 중단."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self._f = tempfile.NamedTemporaryFile(dir=directory, prefix=UPLOAD_PREFIX, delete=False)
+        self.path = self._f.name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self.consumed = False
+
+    def write(self, b) -> int:
+        self.size += len(b)
+        if self.max_bytes and self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge()
+        self._sha256.update(b)
+        return self._f.write(b)
+
+    @property
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+    def discard(self):
+        try:
+            self._f.close()
+        finally:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self.consumed = True
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class PhotoStore:
+    def __init__(self, blob_dir: str, max_bytes: int):
+        self.blob_dir = blob_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._names = None  # {name: "hash.ext"} — 지연 로드
+        self._names_mtime = None
+
+    # ---------- 업로드 ----------
+    def open_upload(self) -> HashingUploadFile:
+        return HashingUploadFile(self.blob_dir, self.max_bytes)
+
+    def ingest(self, file_storage) -> tuple[str, bool]:
+        """
+        업로드를 blob으로 확정한다. (blob 이름 "hash.ext", 새로 저장됐는지) 반환.
+        이미지가 아니면 InvalidImage.
+        """
+        up = file_storage.stream
+        if not isinstance(up, HashingUploadFile):
+            # 커스텀 스트림을 거치지 않은 업로드(테스트 등): 여기서 흘려 쓰며 해시
+            src, up = up, self.open_upload()
+            for chunk in iter(lambda: src.read(1 << 16), b""):
+                up.write(chunk)
+        up.flush()
+        up.seek(0)
+        head = up.read(16)
+        up.close()
+        up.consumed = True
+
+        ext = sniff_image_ext(head)
+        if ext is None or not self._verify(up.path):
+            os.remove(up.path)
+            raise InvalidImage("not an image")
+
+        blob = f"{up.hexdigest}.{ext}"
+        dst = self.blob_path(blob)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.exists(dst):
+            os.remove(up.path)  # 중복: 저장소 공유
+            return blob, False
+        os.replace(up.path, dst)
+        return blob, True
+
+    @staticmethod
+    def _verify(path: str) -> bool:
+        if not HAS_PIL:
+            return True
+        from PIL import Image
+        try:
+            with Image.open(path) as im:
+                im.verify()
+            return True
+        except Exception:
+            return False
+
+    # ---------- 이름 ↔ blob ----------
+    def blob_path(self, blob: str) -> str:
+        return os.path.join(self.blob_dir, blob[:2], blob)
+
+    def blob_rel(self, blob: str) -> str:
+        return f"{blob[:2]}/{blob}"
+
+    def name_for_blob(self, blob: str) -> str | None:
+        for name, b in self._load().items():
+            if b == blob:
+                return name
+        return None
+
+    def link(self, blob: str, target_path: str):
+        """보이는 이름을 blob에 하드링크로 연결 (다른 파일시스템이면 reflink/복사)."""
+        with self._index_lock():
+            # 잠근 채로 링크해야 다른 워커의 unlink_name이 그 사이에 blob을 지우지 못한다
+            clone_file(self.blob_path(blob), target_path)
+            names = dict(self._load(force=True))
+            names[os.path.basename(target_path)] = blob
+            self._save(names)
+
+    def unlink_name(self, name: str):
+        """이름 매핑을 지우고, 더 이상 참조가 없으면 blob도 지운다."""
+        with self._index_lock():
+            names = dict(self._load(force=True))
+            blob = names.pop(name, None)
+            self._save(names)
+            if blob and blob not in names.values():
+                self._remove_blob(blob)
+
+    def discard(self, blob: str):
+        """어느 이름에도 연결되지 않은 blob을 지운다 (ingest 직후 link가 실패했을 때)."""
+        with self._index_lock():
+            if blob not in self._load(force=True).values():
+                self._remove_blob(blob)
+
+    def prune(self, existing_names):
+        """폴더에 더 이상 없는 이름의 매핑을 정리한다 (초기화 후 등)."""
+        existing = set(existing_names)
+        with self._index_lock():
+            names = self._load(force=True)
+            gone = [n for n in names if n not in existing]
+        for n in gone:
+            self.unlink_name(n)
+
+    def mapping(self) -> dict:
+        """이름 → blob 매핑 (다른 워커가 바꿨으면 다시 읽음). 목록 한 번에 한 번만 부른다."""
+        return self._load()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.blob_dir, INDEX_NAME)
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """index.json 읽기-수정-쓰기 구간: 스레드는 threading.Lock, 워커 프로세스는 flock"""
+        with self._lock:
+            if fcntl is None:  # Windows: 단일 프로세스 개발 서버만 가정
+                yield
+                return
+            os.makedirs(self.blob_dir, exist_ok=True)
+            with open(os.path.join(self.blob_dir, INDEX_LOCK_NAME), "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _remove_blob(self, blob: str):
+        try:
+            os.remove(self.blob_path(blob))
+        except FileNotFoundError:
+            pass
+
+    def _load(self, force: bool = False) -> dict:
+        """force면 mtime과 상관없이 디스크에서 다시 읽는다 (잠근 뒤 수정할 때)"""
+        try:
+            mtime = os.stat(self._index_path()).st_mtime_ns
+        except OSError:
+            mtime = None
+        if force or self._names is None or mtime != self._names_mtime:
+            try:
+                with open(self._index_path(), encoding="utf-8") as f:
+                    self._names = json.load(f)
+            except (OSError, ValueError):
+                self._names = {}
+            self._names_mtime = mtime
+        return self._names
+
+    def _save(self, names: dict):
+        os.makedirs(self.blob_dir, exist_ok=True)
+        path = self._index_path()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(names, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, path)
+        self._names = names
+        self._names_mtime = os.stat(path).st_mtime_ns
+
+
+# ---------- 폴더 복제/교체 ----------
+def clone_file(src: str, dst: str) -> str:
+    """하드링크 → reflink → 복사 순으로 시도. 어떤 방식을 썼는지 반환."""
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        pass
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            shutil.copystat(src, dst)
+            return "reflink"
+        except OSError:
+            try:
+                os.remove(dst)
+            except OSError:
+                pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def clone_tree(src: str, dst: str) -> dict:
+    """src 트리를 새 폴더 dst로 복제 (파일 바이트는 가능한 한 복사하지 않음). 방식별 개수 반환."""
+    counts = {}
+    os.makedirs(dst)
+    for root, dirs, files in os.walk(src):
+        out = os.path.join(dst, os.path.relpath(root, src))
+        for d in dirs:
+            os.makedirs(os.path.join(out, d), exist_ok=True)
+        for f in files:
+            how = clone_file(os.path.join(root, f), os.path.join(out, f))
+            counts[how] = counts.get(how, 0) + 1
+    return counts
+
+
+def _exchange(a: str, b: str) -> bool:
+    """renameat2(RENAME_EXCHANGE)로 두 경로를 원자적으로 맞바꾼다. 지원 안 하면 False."""
+    if not sys.platform.startswith("linux"):
+        return False  # renameat2는 리눅스 전용 (Windows는 CDLL(None) 자체가 TypeError)
+    try:
+        fn = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError, TypeError):
+        return False
+    fn.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint)
+    if fn(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+        return False
+    raise OSError(err, os.strerror(err), b)
+
+
+def replace_dir(new: str, target: str) -> str | None:
+    """
+    new 폴더를 target 자리에 끼운다. 예전 내용이 남은 경로(지울 대상)를 반환.
+    리눅스는 한 번의 교환이라 target이 비어 보이는 순간이 없고,
+    그 외에는 rename 두 번 사이의 아주 짧은 틈만 남는다.
+    """
+    if not os.path.exists(target):
+        os.rename(new, target)
+        return None
+    if _exchange(new, target):
+        return new
+    old = new + ".old"
+    os.rename(target, old)
+    os.rename(new, target)
+    return old
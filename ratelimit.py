@@ -0,0 +1,204 @@
+# ratelimit.py
+"""
+토큰 버킷 요청 속도 제한.
+
+규칙은 "N/초" 형식: 버킷 크기 N(순간 허용량), 초마다 N개씩 다시 찬다. 예) "5/60" = 분당 5회, 연속 5회까지.
+키(클라이언트 IP, 메시지 id 등)마다 (남은 토큰, 마지막 갱신 시각) 두 값만 들고 있어 확인은 O(1)이다.
+
+저장소 (RATE_LIMIT_URL)
+  - 비어 있으면 프로세스 메모리 (키 수 상한이 있는 LRU). 제한은 워커별로 적용된다.
+  - redis://...        Lua 스크립트 한 번으로 원자적으로 갱신 (여러 호스트/워커가 한 버킷을 공유)
+  - sqlite:///path.db  단일 호스트의 워커들이 한 파일을 공유 (BEGIN IMMEDIATE로 직렬화)
+공유 저장소 오류 시에는 요청을 막지 않는다(fail-open) — 제한기 장애가 서비스 장애가 되지 않도록.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+
+class RateLimited(Exception):
+    def __init__(self, rule: str, retry_after: float):
+        super().__init__(f"rate limited: {rule}")
+        self.rule = rule
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def parse_rate(spec: str):
+    """"N/초" → (capacity, 초당 충전량). 비었거나 0이면 None (제한 없음)."""
+    spec = (spec or "").strip()
+    if not spec or spec == "0":
+        return None
+    n, _, per = spec.partition("/")
+    capacity, period = float(n), float(per or 1)
+    if capacity <= 0 or period <= 0:
+        return None
+    return capacity, capacity / period
+
+
+def _refill(tokens: float, updated_at: float, capacity: float, rate: float, now: float):
+    """버킷 갱신 → (허용 여부, 남은 토큰)"""
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return True, tokens - 1
+    return False, tokens
+
+
+# ====== 저장소 ======
+class MemoryBuckets:
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # {key: (tokens, updated_at)}
+
+    def take(self, key: str, capacity: float, rate: float, now: float):
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            allowed, tokens = _refill(tokens, updated_at, capacity, rate, now)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # 가장 오래 안 쓰인 키 (가득 찬 버킷일 가능성이 큼)
+        return allowed, tokens
+
+
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(b[1]) or capacity
+local ts = tonumber(b[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBuckets:
+    def __init__(self, url: str, prefix: str = "hbd:rl:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_URL=redis://... 에는 redis 패키지가 필요합니다 (pip install redis)") from e
+        self._redis = redis
+        self.url = url
+        self.prefix = prefix
+        self._script = None
+        self._pid = None
+
+    def take(self, key: str, capacity: float, rate: float, now: float):
+        if self._pid != os.getpid():  # fork 이후 연결 재사용 금지
+            client = self._redis.Redis.from_url(self.url, socket_timeout=0.2, socket_connect_timeout=0.2)
+            self._script = client.register_script(_REDIS_TAKE)
+            self._pid = os.getpid()
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, now])
+        return bool(allowed), float(tokens)
+
+
+class SQLiteBuckets:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float, now: float):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            allowed, tokens = _refill(tokens, updated_at, capacity, rate, now)
+            conn.execute("INSERT OR REPLACE INTO rate_bucket (key, tokens, updated_at) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                # 한 시간 넘게 안 쓰인 버킷은 어차피 가득 찬 상태 → 지워도 결과가 같다
+                conn.execute("DELETE FROM rate_bucket WHERE updated_at < ?", (now - 3600,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+
+def buckets_from_url(url: str, max_keys: int = 100000):
+    if not url:
+        return MemoryBuckets(max_keys)
+    scheme = urlsplit(url).scheme
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBuckets(url)
+    if scheme == "sqlite":
+        return SQLiteBuckets(url[len("sqlite:///"):])
+    raise ValueError(f"unknown RATE_LIMIT_URL scheme: {scheme}")
+
+
+# ====== 제한기 ======
+class RateLimiter:
+    def __init__(self, storage=None, enabled: bool = True):
+        self.storage = storage if storage is not None else MemoryBuckets()
+        self.enabled = enabled
+        self.rules = {}  # {이름: (capacity, rate)}
+        self._lock = threading.Lock()
+        self.rejected = {}  # {이름: 거절 수}
+
+    @property
+    def in_memory(self) -> bool:
+        return isinstance(self.storage, MemoryBuckets)
+
+    def rule(self, name: str, spec: str):
+        rate = parse_rate(spec)
+        if rate is None:
+            self.rules.pop(name, None)
+        else:
+            self.rules[name] = rate
+        self.rejected.setdefault(name, 0)
+
+    def check(self, name: str, key: str):
+        """토큰 하나를 쓴다. 없으면 RateLimited."""
+        rule = self.rules.get(name)
+        if not self.enabled or rule is None:
+            return
+        capacity, rate = rule
+        try:
+            allowed, tokens = self.storage.take(f"{name}:{key}", capacity, rate, time.time())
+        except Exception as e:
+            print("⚠️ rate limit storage error:", e)
+            return
+        if not allowed:
+            with self._lock:
+                self.rejected[name] += 1
+            raise RateLimited(name, (1 - tokens) / rate)
+
+
+def ratelimit_metrics_lines(limiter: RateLimiter) -> list[str]:
+    with limiter._lock:
+        rejected = dict(limiter.rejected)
+    out = [
+        "# HELP hbd_rate_limited_total Requests rejected by the rate limiter.",
+        "# TYPE hbd_rate_limited_total counter",
+    ]
+    for name, n in sorted(rejected.items()):
+        out.append(f'hbd_rate_limited_total{{rule="{name}"}} {n}')
+    return out
@@ -0,0 +1,182 @@
+# search.py
+"""
+방명록 전문 검색 (Message.nickname + Message.text).
+
+- SQLite: FTS5 가상 테이블 message_fts(rowid = message.id).
+  방명록 추가/수정/삭제 핸들러가 같은 트랜잭션 안에서 index()/remove()를 호출해 동기화한다.
+- PostgreSQL: message.search_tsv 생성 컬럼(tsvector, STORED) + GIN 인덱스.
+  DB가 행과 함께 갱신하므로 index()/remove()는 아무 일도 하지 않는다.
+
+한국어는 조사가 단어 뒤에 붙으므로("생일축하해요") 검색어마다 접두어 매칭(FTS5 "생일"*,
+tsquery 생일:*)을 쓴다. 결과는 관련도(bm25 / ts_rank) 순이며 닉네임 일치에 가중치를 더 준다.
+인덱스가 없으면(FTS5 미지원 빌드 등) LIKE 스캔으로 대체한다.
+"""
+import re
+
+from sqlalchemy import text
+
+from models import Message, db
+
+FTS_TABLE = "message_fts"
+MAX_TERMS = 8
+MAX_RESULTS = 1000  # 너무 깊은 페이지는 막는다 (OFFSET 비용 상한)
+
+FTS_DELETE = text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id")
+FTS_INSERT = text(f"INSERT INTO {FTS_TABLE}(rowid, nickname, text) VALUES (:id, :nickname, :text)")
+
+_TSV_EXPR = (
+    "setweight(to_tsvector('simple', coalesce(nickname, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(text, '')), 'B')"
+)
+
+
+def query_terms(q: str) -> list[str]:
+    """검색어를 단어 문자만 남긴 토큰으로 (FTS 문법 문자는 버림)"""
+    return re.findall(r"\w+", q or "")[:MAX_TERMS]
+
+
+class MessageSearch:
+    def __init__(self, app=None):
+        self._ready = None  # 인덱스 존재 여부 (프로세스당 한 번 확인)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["message_search"] = self
+
+    @property
+    def dialect(self) -> str:
+        return db.engine.dialect.name
+
+    # ---------- 인덱스 생성/재구축 (init_db) ----------
+    def ensure_index(self) -> bool:
+        """인덱스를 만들고 비어 있거나 어긋났으면 채운다. 성공 여부 반환."""
+        try:
+            if self.dialect == "sqlite":
+                self._ensure_sqlite()
+            elif self.dialect == "postgresql":
+                self._ensure_postgres()
+            else:
+                return False
+        except Exception as e:
+            print("⚠️ search index error:", e)
+            db.session.rollback()
+            self._ready = False
+            return False
+        self._ready = True
+        return True
+
+    def _ensure_sqlite(self):
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(nickname, text, tokenize='unicode61', prefix='1 2 3')"
+        ))
+        indexed = db.session.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+        total = db.session.query(Message.id).count()
+        if indexed != total:
+            self.rebuild()
+        db.session.commit()
+
+    def _ensure_postgres(self):
+        db.session.execute(text(
+            "ALTER TABLE message ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+            f"GENERATED ALWAYS AS ({_TSV_EXPR}) STORED"
+        ))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_message_search_tsv ON message USING GIN (search_tsv)"
+        ))
+        db.session.commit()
+
+    def rebuild(self):
+        """FTS5 테이블을 message 테이블 기준으로 다시 채운다 (커밋은 호출자가)."""
+        if self.dialect != "sqlite":
+            return
+        db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        db.session.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, nickname, text) "
+            "SELECT id, coalesce(nickname, ''), text FROM message"
+        ))
+
+    def is_ready(self) -> bool:
+        if self._ready is None:
+            try:
+                if self.dialect == "sqlite":
+                    sql = "SELECT 1 FROM sqlite_master WHERE name = :n"
+                    self._ready = db.session.execute(text(sql), {"n": FTS_TABLE}).first() is not None
+                elif self.dialect == "postgresql":
+                    sql = ("SELECT 1 FROM information_schema.columns "
+                           "WHERE table_name = 'message' AND column_name = 'search_tsv' "
+                           "AND table_schema = current_schema()")
+                    self._ready = db.session.execute(text(sql)).first() is not None
+                else:
+                    self._ready = False
+            except Exception as e:
+                print("⚠️ search index check error:", e)
+                self._ready = False
+            if not self._ready:
+                print("⚠️ search index missing → LIKE fallback (run init_db.py)")
+        return self._ready
+
+    # ---------- 동기화 (핸들러에서 커밋 전에 호출) ----------
+    def index(self, msg: Message):
+        if self.dialect != "sqlite" or not self.is_ready():
+            return
+        db.session.flush()  # 새 메시지의 id 확보
+        self.remove(msg.id)
+        db.session.execute(FTS_INSERT, {"id": msg.id, "nickname": msg.nickname or "", "text": msg.text or ""})
+
+    def remove(self, message_id: int):
+        if self.dialect != "sqlite" or not self.is_ready():
+            return
+        db.session.execute(FTS_DELETE, {"id": message_id})
+
+    # ---------- 검색 ----------
+    def search(self, q: str, offset: int = 0, limit: int = 20):
+        """
+        관련도 순 (Message 목록, 점수 목록, 다음 페이지 존재 여부).
+        limit+1건을 읽어 다음 페이지 여부를 판단한다.
+        """
+        terms = query_terms(q)
+        if not terms or offset >= MAX_RESULTS:
+            return [], [], False
+        limit = min(limit, MAX_RESULTS - offset)
+        sql, params = search_statement(self.dialect if self.is_ready() else None, terms, offset, limit)
+        rows = db.session.execute(sql, params).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        by_id = {m.id: m for m in Message.query.filter(Message.id.in_([r.id for r in rows])).all()}
+        hits = [(by_id[r.id], float(r.score)) for r in rows if r.id in by_id]
+        return [m for m, _ in hits], [s for _, s in hits], has_more
+
+
+def search_statement(dialect: str | None, terms: list[str], offset: int, limit: int):
+    """
+    (SQL, 파라미터) — id/score 열을 limit+1건까지. 동기 세션과 ASGI의 async 연결이 같이 쓴다.
+    dialect가 None이면 인덱스 없음 → LIKE 스캔.
+    """
+    params = {"limit": limit + 1, "offset": offset}
+    if dialect == "sqlite":
+        params["q"] = " ".join(f'"{t}"*' for t in terms)
+        return text(
+            f"SELECT rowid AS id, -bm25({FTS_TABLE}, 2.0, 1.0) AS score FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :q ORDER BY score DESC, rowid DESC "
+            "LIMIT :limit OFFSET :offset"
+        ), params
+    if dialect == "postgresql":
+        params["q"] = " & ".join(f"{t}:*" for t in terms)
+        return text(
+            "SELECT id, ts_rank(search_tsv, query) AS score "
+            "FROM message, to_tsquery('simple', :q) AS query "
+            "WHERE search_tsv @@ query ORDER BY score DESC, id DESC "
+            "LIMIT :limit OFFSET :offset"
+        ), params
+    conds = []
+    for i, t in enumerate(terms):
+        params[f"t{i}"] = f"%{t}%"
+        conds.append(f"(coalesce(nickname, '') LIKE :t{i} OR text LIKE :t{i})")
+    return text(
+        "SELECT id, 0 AS score FROM message WHERE " + " AND ".join(conds) +
+        " ORDER BY id DESC LIMIT :limit OFFSET :offset"
+    ), params
+
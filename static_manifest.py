@@ -0,0 +1,101 @@
+# static_manifest.py
+"""
+정적 파일 매니페스트 빌더.
+
+static_example 아래 모든 파일의 내용 해시를 미리 계산해 JSON으로 저장한다.
+앱은 시작할 때 한 번 읽어 두고 static_v()가 파일시스템 접근 없이 URL을 만든다.
+
+    python static_manifest.py            # 해시만 (?v=<hash>)
+    python static_manifest.py --hashed   # .hashed/name.<hash>.ext 사본도 생성 (쿼리스트링 없는 불변 URL)
+
+텍스트 자산(css/js/svg 등)은 옆에 .gz/.br 사본을 함께 만들고 매니페스트에 "encodings"로 적어 둔다.
+(--no-compress 로 끌 수 있음)
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from compression import PRECOMPRESS_EXTS, precompress_file
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static_example")
+MANIFEST_PATH = os.path.join(BASE_DIR, "static_manifest.json")
+
+# 해시 사본은 원본 폴더(사진 카탈로그가 보는 곳)를 어지럽히지 않도록 별도 트리에 둔다
+HASHED_DIRNAME = ".hashed"
+_SKIP_SUFFIXES = (".gz", ".br")
+
+
+def file_digest(path: str) -> str:
+    """기존 _digest_of_static 과 같은 규칙(md5 앞 10자리)이라 URL이 바뀌지 않는다."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:10]
+
+
+def _hashed_name(rel: str, digest: str) -> str:
+    root, ext = os.path.splitext(rel)
+    return f"{HASHED_DIRNAME}/{root}.{digest}{ext}"
+
+
+def iter_static_files(static_dir: str = STATIC_DIR):
+    """static_dir 기준 상대경로(슬래시 구분)를 정렬해서 돌려준다. 숨김 폴더(.hashed/.derived)는 제외."""
+    rels = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.endswith(_SKIP_SUFFIXES):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), static_dir)
+            rels.append(rel.replace(os.sep, "/"))
+    return sorted(rels)
+
+
+def build_manifest(static_dir: str = STATIC_DIR, out_path: str = MANIFEST_PATH,
+                   hashed_names: bool = False, precompress: bool = True) -> dict:
+    files = {}
+    for rel in iter_static_files(static_dir):
+        src = os.path.join(static_dir, rel)
+        digest = file_digest(src)
+        entry = {"hash": digest}
+        if hashed_names:
+            hashed = _hashed_name(rel, digest)
+            dst = os.path.join(static_dir, hashed)
+            if not os.path.exists(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                try:
+                    os.link(src, dst)  # 같은 파일시스템이면 복사 없이
+                except OSError:
+                    shutil.copy2(src, dst)
+            entry["hashed"] = hashed
+        if precompress and os.path.splitext(rel)[1].lower() in PRECOMPRESS_EXTS:
+            encodings = precompress_file(src)
+            if encodings:
+                entry["encodings"] = encodings
+        files[rel] = entry
+
+    manifest = {"files": files}
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, out_path)
+    return manifest
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    """{상대경로: {"hash": ..., "hashed": ..., "encodings": [...]}} — 없거나 깨졌으면 빈 dict."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    m = build_manifest(hashed_names="--hashed" in args, precompress="--no-compress" not in args)
+    print(f"✅ static manifest: {len(m['files'])} files → {MANIFEST_PATH}")
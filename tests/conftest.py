@@ -0,0 +1,17 @@
+# tests/conftest.py
+"""테스트 공통 환경: app import 전에 DB(primary + replica 역할의 두 번째 SQLite)와 상태 파일을 임시 폴더로."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="hbd-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'primary.db')}"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{os.path.join(_tmp, 'replica.db')}"
+os.environ["EDIT_PHOTOS_DIR"] = os.path.join(_tmp, "photos_edit")
+os.environ["CONTENT_VERSION_FILE"] = os.path.join(_tmp, "content_version")
+os.environ["LIKE_COUNTS_VERSION_FILE"] = os.path.join(_tmp, "like_counts_version")
+os.environ["MEDIA_SEND_MODE"] = "python"
+os.environ["SLACK_WEBHOOK_URL"] = ""
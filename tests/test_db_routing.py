@@ -0,0 +1,68 @@
+# tests/test_db_routing.py
+"""두 SQLite 파일(primary / replica)로 읽기 라우팅과 쓰기 직후 유예(read-your-writes) 확인"""
+import pytest
+from sqlalchemy import select
+
+import app as app_module
+from app import app
+from db_routing import REPLICA_BIND, read_only
+from models import Message, db
+
+
+def _insert(engine, text):
+    with engine.begin() as conn:
+        conn.execute(Message.__table__.insert().values(text=text, like_count=0))
+
+
+def _texts(engine):
+    with engine.connect() as conn:
+        return set(conn.execute(select(Message.__table__.c.text)).scalars())
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    # 유예 없음: 쓰기 스탬프와 상관없이 replica를 써도 되는 상태에서 시작
+    monkeypatch.setattr(app_module, "REPLICA_MAX_LAG_SECONDS", 0.0)
+    with app.app_context():
+        primary, replica = db.engines[None], db.engines[REPLICA_BIND]
+        for engine in (primary, replica):
+            db.metadata.drop_all(engine)
+            db.metadata.create_all(engine)
+        # 복제가 아직 안 된 상태를 흉내: 두 DB의 내용이 다르다
+        _insert(primary, "primary-only")
+        _insert(replica, "replica-only")
+        yield primary, replica
+        db.session.remove()
+
+
+def _read_texts():
+    """@read_only 뷰 안에서 세션으로 조회한 메시지 텍스트"""
+    with app.test_request_context("/"):
+        return read_only(lambda: {m.text for m in Message.query.all()})()
+
+
+def test_reads_go_to_replica(engines):
+    assert _read_texts() == {"replica-only"}
+
+
+def test_writes_and_flushes_go_to_primary(engines):
+    primary, replica = engines
+    with app.test_request_context("/"):
+        @read_only
+        def view():
+            db.session.add(Message(text="new"))
+            db.session.flush()
+            # 플러시 대기 중인 객체가 있으면 조회도 primary (autoflush)
+            assert "new" in {m.text for m in Message.query.all()}
+            db.session.commit()
+
+        view()
+    assert "new" in _texts(primary)
+    assert "new" not in _texts(replica)
+
+
+@pytest.mark.parametrize("stamp", ["content_version", "like_counts_version"])
+def test_reads_primary_inside_grace_window(engines, monkeypatch, stamp):
+    monkeypatch.setattr(app_module, "REPLICA_MAX_LAG_SECONDS", 3600.0)
+    getattr(app_module, stamp).bump()
+    assert _read_texts() == {"primary-only"}
@@ -0,0 +1,78 @@
+# tests/test_media_send.py
+"""MEDIA_SEND_MODE=python 에서 실제 파일을 test_client로 받아 200 / 304 / 206 / 416 확인"""
+import os
+
+import pytest
+
+from app import app
+
+PHOTO = "test.jpg"
+BODY = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client():
+    os.makedirs(os.environ["EDIT_PHOTOS_DIR"], exist_ok=True)
+    with open(os.path.join(os.environ["EDIT_PHOTOS_DIR"], PHOTO), "wb") as f:
+        f.write(BODY)
+    return app.test_client()
+
+
+def test_full_response(client):
+    resp = client.get(f"/media_example/photos/{PHOTO}")
+    assert resp.status_code == 200
+    assert resp.data == BODY
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    assert resp.headers["ETag"] and resp.headers["Last-Modified"]
+
+
+def test_not_modified(client):
+    first = client.get(f"/media_example/photos/{PHOTO}")
+    by_etag = client.get(f"/media_example/photos/{PHOTO}", headers={"If-None-Match": first.headers["ETag"]})
+    assert by_etag.status_code == 304
+    by_date = client.get(
+        f"/media_example/photos/{PHOTO}", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert by_date.status_code == 304
+
+
+def test_range(client):
+    resp = client.get(f"/media_example/photos/{PHOTO}", headers={"Range": "bytes=100-199"})
+    assert resp.status_code == 206
+    assert resp.data == BODY[100:200]
+    assert resp.headers["Content-Range"] == f"bytes 100-199/{len(BODY)}"
+
+
+def test_if_range(client):
+    first = client.get(f"/media_example/photos/{PHOTO}")
+    ok = client.get(f"/media_example/photos/{PHOTO}",
+                    headers={"Range": "bytes=0-9", "If-Range": first.headers["Last-Modified"]})
+    assert ok.status_code == 206
+    stale = client.get(f"/media_example/photos/{PHOTO}", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200
+    assert stale.data == BODY
+
+
+def test_unsatisfiable_range(client):
+    resp = client.get(f"/media_example/photos/{PHOTO}", headers={"Range": f"bytes={len(BODY) + 10}-"})
+    assert resp.status_code == 416
+
+
+def test_static_file(client):
+    resp = client.get("/static_example/favicon-32x32.png")
+    assert resp.status_code == 200
+    again = client.get("/static_example/favicon-32x32.png", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_static_cache_control(client):
+    from app import static_v
+
+    with app.test_request_context():
+        versioned = static_v("favicon-32x32.png")
+    resp = client.get(versioned)
+    assert resp.cache_control.immutable
+    assert resp.cache_control.max_age == 31536000
+    # 해시 없는 URL은 영구 캐시하지 않는다 (재배포 후 옛 자산에 묶이지 않도록)
+    plain = client.get("/static_example/favicon-32x32.png")
+    assert not plain.cache_control.immutable
+    assert plain.cache_control.max_age == 300
@@ -0,0 +1,63 @@
+# versioning.py
+"""
+페이지 조건부 응답(ETag)을 위한 콘텐츠 버전.
+
+메시지/좋아요/생일자 메시지/사진이 바뀔 때마다 스탬프 파일에 새 버전(나노초 시각, 항상 증가)을 쓰고,
+요청 때는 그 작은 파일을 읽어 현재 버전을 안다. 같은 호스트의 모든 워커가 같은 파일을 보므로
+다른 워커에서 일어난 쓰기도 바로 반영된다.
+값은 mtime이 아니라 파일 내용에 둔다 — 타임스탬프 해상도가 거친 파일시스템(ext3, 일부 NFS/overlay, FAT)에서는
+mtime을 1ns 올려도 잘려서 그대로일 수 있기 때문. 쓰기는 임시 파일 + rename으로 원자적이다.
+"""
+import hashlib
+import os
+import threading
+import time
+
+
+class ContentVersion:
+    def __init__(self, path: str):
+        self.path = path
+
+    def bump(self) -> int:
+        """버전을 올린다(항상 단조 증가). 새 버전을 반환."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        now = time.time_ns()
+        cur = self._read()
+        if cur is not None and now <= cur:
+            now = cur + 1
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="ascii") as f:
+            f.write(str(now))
+        os.replace(tmp, self.path)
+        return now
+
+    def current(self) -> int:
+        v = self._read()
+        return v if v is not None else self.bump()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="ascii") as f:
+                data = f.read().strip()
+            # 예전 형식(빈 파일, 버전 = mtime)도 그대로 읽는다
+            return int(data) if data else os.stat(self.path).st_mtime_ns
+        except (OSError, ValueError):
+            return None
+
+
+def fingerprint(*parts) -> str:
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(repr(p).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:20]
+
+
+def tree_fingerprint(root: str) -> str:
+    """폴더 안 파일들의 (경로, 크기, mtime) 지문 — 배포 시 템플릿이 바뀌면 달라진다."""
+    items = []
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            st = os.stat(os.path.join(dirpath, name))
+            items.append((os.path.relpath(os.path.join(dirpath, name), root), st.st_size, st.st_mtime_ns))
+    return fingerprint(*sorted(items))